@@ -0,0 +1,55 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+"""
+import_benchmark.py
+Guards the import path of the optimization core: every core module must be importable
+with the standard library and NumPy only, and fast enough to be started in sweep workers.
+
+Usage:
+    python benchmarks/import_benchmark.py [limit_seconds]
+"""
+
+ROOT = Path(__file__).resolve().parent.parent
+CORE_MODULES = ["src.functions", "src.scheduler", "src.break_checker", "src.gradient_optimizer", "src.sgd_optimizer"]
+HEAVY_MODULES = ["plotly", "scipy", "pandas", "torch", "keras", "tensorflow", "sklearn", "ucimlrepo"]
+DEFAULT_LIMIT = 1.0
+REPEATS = 5
+
+PROBE = f"""
+import sys, time
+begin = time.perf_counter()
+{"; ".join(f"import {module}" for module in CORE_MODULES)}
+elapsed = time.perf_counter() - begin
+heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+print(elapsed, ",".join(heavy))
+"""
+
+
+def measure() -> tuple[float, list[str]]:
+    output = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout.split()
+    return float(output[0]), output[1].split(",") if len(output) > 1 else []
+
+
+def main() -> int:
+    limit = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_LIMIT
+    begin = time.perf_counter()
+    results = [measure() for _ in range(REPEATS)]
+    best = min(elapsed for elapsed, _ in results)
+    heavy = sorted(set(module for _, modules in results for module in modules))
+    print(f"core import: best {best * 1000:.1f} ms of {REPEATS} runs "
+          f"(total with interpreter start {(time.perf_counter() - begin) * 1000 / REPEATS:.1f} ms per run)")
+    if heavy:
+        print("heavy modules imported by the core:", ", ".join(heavy))
+        return 1
+    if best > limit:
+        print(f"core import is slower than {limit} s")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
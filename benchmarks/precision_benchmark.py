@@ -0,0 +1,103 @@
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.break_checker import ArgumentAbsoluteBreakChecker
+from src.functions import BatchAutomatedDerivableFunction, HyperFunction, VectorHyperFunction, L2
+from src.scheduler import ExponentialDecayScheduler
+from src.sgd_optimizer import StochasticGradientOptimizer
+
+"""
+precision_benchmark.py
+Compares float64 and float32 storage of the dataset on the SGD path:
+memory of the stored dataset (against the list of tuples), throughput of batch gradients
+and the final training loss, which is always computed in float64.
+
+Usage:
+    python benchmarks/precision_benchmark.py [objects_count] [features_count]
+"""
+
+DEFAULT_OBJECTS_COUNT = 200_000
+DEFAULT_FEATURES_COUNT = 50
+BATCH_SIZE = 4096
+ITERATIONS = 500
+SEED = 0
+
+
+def make_dataset(objects_count: int, features_count: int) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    generator = numpy.random.default_rng(SEED)
+    features = numpy.column_stack((numpy.ones(objects_count),
+                                   generator.standard_normal((objects_count, features_count))))
+    weights = generator.standard_normal(features_count + 1)
+    marks = features @ weights + 0.1 * generator.standard_normal(objects_count)
+    return features, marks, weights
+
+
+def measure_tuples(features: numpy.ndarray, marks: numpy.ndarray) -> int:
+    tracemalloc.start()
+    dataset = [(tuple(map(float, obj)), float(mark)) for obj, mark in zip(features, marks)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del dataset
+    return size
+
+
+def measure_storage(features: numpy.ndarray, marks: numpy.ndarray, dtype: type) -> int:
+    func = BatchAutomatedDerivableFunction(HyperFunction(lambda x, y, *w: 0), (features, marks), BATCH_SIZE,
+                                           L2(features.shape[1], 0), dtype=dtype)
+    return sum(array.nbytes for array in func.get_objects_arrays())
+
+
+def get_hyper_function(dimension: int) -> VectorHyperFunction:
+    return VectorHyperFunction(lambda x, y, w: (y - x @ w) ** 2, dimension, lambda x, y, w: -2 * x.T @ (y - x @ w))
+
+
+def measure_throughput(features: numpy.ndarray, marks: numpy.ndarray, dtype: type) -> float:
+    """
+    Returns batch gradients per second on fixed random batches, sampling of the batches is not measured.
+    """
+    dimension = features.shape[1]
+    func = BatchAutomatedDerivableFunction(get_hyper_function(dimension), (features, marks), BATCH_SIZE,
+                                           L2(dimension, 0), dtype=dtype)
+    batches = numpy.random.default_rng(SEED).integers(0, len(marks), (ITERATIONS, BATCH_SIZE))
+    point = numpy.zeros(dimension)
+    begin = time.perf_counter()
+    for batch in batches:
+        func.get_batch_gradient_at(batch, point)
+    return ITERATIONS / (time.perf_counter() - begin)
+
+
+def measure_final_loss(features: numpy.ndarray, marks: numpy.ndarray, dtype: type) -> float:
+    dimension = features.shape[1]
+    optimizer = StochasticGradientOptimizer(ExponentialDecayScheduler(10 ** -4, 10 ** -3),
+                                            ArgumentAbsoluteBreakChecker(0), get_hyper_function(dimension),
+                                            ITERATIONS, history=2)
+    random.seed(SEED)
+    report, _ = optimizer.optimize((features, marks), numpy.zeros(dimension), BATCH_SIZE, L2(dimension, 0),
+                                   dtype=dtype)
+    return float(numpy.mean((marks - features @ report.get_raw_tracking()[-1]) ** 2))
+
+
+def main() -> int:
+    objects_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_OBJECTS_COUNT
+    features_count = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_FEATURES_COUNT
+    features, marks, _ = make_dataset(objects_count, features_count)
+    print(f"{objects_count} objects, {features_count} features, batch {BATCH_SIZE}, {ITERATIONS} iterations")
+    print(f"list of tuples: {measure_tuples(features, marks) / 2 ** 20:.1f} MiB")
+    for dtype in (numpy.float64, numpy.float32):
+        memory = measure_storage(features, marks, dtype)
+        throughput = measure_throughput(features, marks, dtype)
+        loss = measure_final_loss(features, marks, dtype)
+        print(f"{numpy.dtype(dtype).name}: storage {memory / 2 ** 20:.1f} MiB, "
+              f"{throughput:.0f} batch gradients/s, final training loss {loss:.6f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -16,6 +16,7 @@ def main():
     start_point: tuple[float, float] = (10, 10) # Create starting point for algorithm
 
     report: Report = optimizer.optimize(func, start_point)  # Create report about optimization process
+    report._vectorized = True  # The function is elementwise, the surface is computed in one call
 
     report.display()  # Display the report in form of a 3D graph
 
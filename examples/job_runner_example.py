@@ -0,0 +1,34 @@
+import os
+import sys
+import time
+
+import numpy
+
+from src import functions
+from src.job_runner import JobRunner, load_jobs
+
+### dataset
+# synthetic linear regression, the first feature is the intercept
+generator = numpy.random.default_rng(0)
+features = numpy.column_stack((numpy.ones(20000), generator.standard_normal((20000, 10))))
+marks = features @ generator.standard_normal(11) + 0.1 * generator.standard_normal(20000)
+
+### test
+# jobs of config/sgd_jobs.json refer to the model and the dataset registered here by name
+runner = JobRunner(os.path.join("cache", "jobs"), workers=4)
+runner.add_model("linear", functions.VectorHyperFunction(lambda x, y, w: (y - x @ w) ** 2, 11,
+                                                         lambda x, y, w: -2 * x.T @ (y - x @ w)))
+runner.add_dataset("synthetic", (features, marks))
+jobs = load_jobs(os.path.join(os.path.dirname(__file__), "..", "config", "sgd_jobs.json"))
+
+# the second run is served from the cache
+for attempt in range(2):
+    begin = time.perf_counter()
+    results = runner.run(jobs)
+    print(f"run {attempt + 1}: {time.perf_counter() - begin:.2f}s, "
+          f"{runner.cache_hits} cache hits, {runner.cache_misses} misses in total")
+
+for job, (report, calls) in zip(jobs, results):
+    print(job["scheduler"]["name"], job.get("options"), report.get_iterations(), "iterations,",
+          calls, "batches, validation loss:", report._mean_error_value)
+sys.exit(0)
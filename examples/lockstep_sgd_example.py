@@ -0,0 +1,29 @@
+import numpy
+
+from src import functions, sgd_optimizer, scheduler, break_checker
+
+### datasets
+# 200 independent noisy linear regressions y = a * x1 + b * x2 + c
+problems_count, objects_count = 200, 300
+datasets = []
+for _ in range(problems_count):
+    features = numpy.random.uniform(-5, 5, (objects_count, 2))
+    a, b, c = numpy.random.uniform(-3, 3, 3)
+    datasets.append((features, a * features[:, 0] + b * features[:, 1] + c + 0.1 * numpy.random.randn(objects_count)))
+
+### test
+# all problems share the step schedule and are stepped together on stacked arrays,
+# the loss is elementwise, so it is vectorized over the objects
+hyperfunc = functions.HyperFunction(lambda x, y, a, b, c: (y - (a * x[0] + b * x[1] + c)) ** 2, vectorized=True)
+
+optimizer = sgd_optimizer.StochasticGradientOptimizer(
+    scheduler.GolderRatioScheduler(0.01, 20),
+    break_checker.ArgumentAbsoluteBreakChecker(10 ** -3),
+    hyperfunc,
+    300,
+    history=2)
+
+results = optimizer.optimize_many(datasets, (0., 0., 0.), 32, functions.L2(3, 0))
+
+print("mean error:", numpy.mean([report._mean_error_value for report, _ in results]))
+print("mean iterations:", numpy.mean([report.get_iterations() for report, _ in results]))
@@ -0,0 +1,15 @@
+from src import functions, break_checker, simplex_optimizer
+
+### test
+# finite-difference gradients of a noisy function are meaningless, the simplex method uses only its values
+func = functions.NoiseFunction(lambda x, y: (x - 3) ** 2 + 10 * (y + 1) ** 2, creativity=1)
+
+optimizer = simplex_optimizer.ParallelNelderMeadOptimizer(
+    break_checker.ArgumentAbsoluteBreakChecker(10 ** -6),
+    500,
+    initial_size=5,
+    workers=4)  # trial points of every step are evaluated at once
+
+report = optimizer.optimize(func, (0., 0.))
+
+report.display()
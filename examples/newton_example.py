@@ -0,0 +1,17 @@
+import numpy
+
+from src import functions, break_checker, newton_optimizer
+
+### test
+# ill-conditioned quadratic: curvatures from 1 to 10^6
+dimension = 100
+curvatures = numpy.logspace(0, 6, dimension)
+
+# the Hessian is diagonal, its product with v is curvatures * v; without it finite differences of gradients are used
+func = functions.VectorDerivableFunction(lambda w: float(w @ (curvatures * w)) / 2, lambda w: curvatures * w,
+                                         dimension, lambda w, v: curvatures * v)
+
+optimizer = newton_optimizer.NewtonCGOptimizer(break_checker.GradientAbsoluteBreakChecker(10 ** -6), 1000)
+report = optimizer.optimize(func, numpy.ones(dimension))
+
+print(report.get_iterations(), "iterations, distance to the minimum:", numpy.linalg.norm(report.get_raw_tracking()[-1]))
@@ -0,0 +1,34 @@
+import numpy
+
+from src import functions, scheduler, break_checker
+from src.parameter_server import ParameterServerOptimizer
+
+### dataset
+# synthetic linear regression with 200 weights, the first feature is the intercept
+objects_count, weights_count = 200000, 200
+features = numpy.column_stack((numpy.ones(objects_count), numpy.random.randn(objects_count, weights_count - 1)))
+true_weights = numpy.random.randn(weights_count)
+marks = features @ true_weights + 0.1 * numpy.random.randn(objects_count)
+
+### test
+# L(X, y, w) = (y - Xw) ^ 2 for every object of the batch, gradient is the sum over the batch
+hyperfunc = functions.VectorHyperFunction(lambda x, y, w: (y - x @ w) ** 2, weights_count,
+                                          lambda x, y, w: -2 * x.T @ (y - x @ w))
+
+# 4 worker processes connected by TCP on localhost, gradients older than 4 updates are rejected
+optimizer = ParameterServerOptimizer(
+    scheduler.ExponentialDecayScheduler(2 * 10 ** -4, 10 ** -4),
+    break_checker.ArgumentAbsoluteBreakChecker(10 ** -6),
+    hyperfunc,
+    3000,
+    workers=4,
+    max_staleness=4,
+    history=2,
+    address=("localhost", 0))
+
+report, calls = optimizer.optimize((features, marks), numpy.zeros(weights_count), 512,
+                                   functions.L2(weights_count, 0))
+report._func_calls = calls
+
+print(report.get_iterations(), "updates from", calls, "gradients:", report.get_summary()["statistics"])
+print("distance to the true weights:", numpy.linalg.norm(report.get_raw_tracking()[-1] - true_weights))
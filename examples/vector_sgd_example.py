@@ -0,0 +1,35 @@
+import numpy
+
+from src import functions, sgd_optimizer, scheduler, break_checker
+
+### dataset
+# synthetic linear regression with 1000 weights
+objects_count, weights_count = 5000, 1000
+features = numpy.random.randn(objects_count, weights_count)
+true_weights = numpy.random.randn(weights_count)
+marks = features @ true_weights + 0.01 * numpy.random.randn(objects_count)
+
+### test
+# L(X, y, w) = (y - Xw) ^ 2 for every object of the batch, gradient is the sum over the batch
+hyperfunc = functions.VectorHyperFunction(lambda x, y, w: (y - x @ w) ** 2, weights_count,
+                                          lambda x, y, w: -2 * x.T @ (y - x @ w))
+
+optimizer = sgd_optimizer.StochasticGradientOptimizer(
+    scheduler.ExponentialDecayScheduler(10 ** -4, 10 ** -3),
+    break_checker.ArgumentAbsoluteBreakChecker(10 ** -6),
+    hyperfunc,
+    2000,
+    history=2)  # keep only the last points of the trajectory
+
+report, calls = optimizer.optimize(
+    (features, marks),
+    numpy.zeros(weights_count),
+    256,
+    functions.L2(weights_count, 0.001),
+    validation_fraction=0.1,
+    validation_interval=50
+)
+report._func_calls = calls
+
+print(report.get_summary()["iterations"], "iterations, validation loss:", report._mean_error_value)
+print("distance to the true weights:", numpy.linalg.norm(report.get_raw_tracking()[-1] - true_weights))
@@ -2,18 +2,26 @@ from dataclasses import dataclass
 from abc import ABC
 from typing import Callable
 
-from src.functions import DerivableFunction
-from src.utilities import element_wise_addition, norm
+import numpy
+
+from src.functions import Function, DerivableFunction, BatchAutomatedDerivableFunction
+from src.utilities import norm
+
+
+def _get_value(func: Function, point: numpy.ndarray) -> float:
+    if isinstance(func, DerivableFunction):
+        return func.value_and_gradient(point)[0]
+    return func.evaluate(point)
 
 
 @dataclass
 class BreakChecker(ABC):
     __epsilon: float
     __desired_length: int
-    __check_value_getter: Callable[[list[tuple[float, ...]], DerivableFunction], float]
-    _relativity_function: Callable[[tuple[float, ...], DerivableFunction], float] | None = None
+    __check_value_getter: Callable[[list[numpy.ndarray], DerivableFunction], float]
+    _relativity_function: Callable[[numpy.ndarray, DerivableFunction], float] | None = None
 
-    def is_done(self, consideration_arguments: list[tuple[float, ...]], func: DerivableFunction) -> bool:
+    def is_done(self, consideration_arguments: list[numpy.ndarray], func: DerivableFunction) -> bool:
         if self.__desired_length == 0 and self._relativity_function is not None:
             self.__desired_length += 1
         if len(consideration_arguments) < self.__desired_length:
@@ -24,7 +32,7 @@ class BreakChecker(ABC):
 
 class ArgumentAbsoluteBreakChecker(BreakChecker):
     def __init__(self, epsilon: float) -> None:
-        super().__init__(epsilon, 2, lambda args, _: norm(element_wise_addition(args[-1], args[-2], -1)))
+        super().__init__(epsilon, 2, lambda args, _: norm(args[-1] - args[-2]))
 
 
 class ArgumentRelativeBreakChecker(ArgumentAbsoluteBreakChecker):
@@ -35,21 +43,36 @@ class ArgumentRelativeBreakChecker(ArgumentAbsoluteBreakChecker):
 
 class FunctionAbsoluteBreakChecker(BreakChecker):
     def __init__(self, epsilon: float) -> None:
-        super().__init__(epsilon, 2, lambda args, func: abs(func.apply(*args[-1]) - func.apply(*args[-2])))
+        super().__init__(epsilon, 2, lambda args, func: abs(_get_value(func, args[-1]) - _get_value(func, args[-2])))
 
 
 class FunctionRelativeBreakChecker(FunctionAbsoluteBreakChecker):
     def __init__(self, epsilon: float) -> None:
         super().__init__(epsilon)
-        self._relativity_function = lambda x, func: abs(func.apply(x)) + 1
+        self._relativity_function = lambda x, func: abs(_get_value(func, x)) + 1
 
 
 class GradientAbsoluteBreakChecker(BreakChecker):
     def __init__(self, epsilon: float):
-        super().__init__(epsilon, 1, lambda args, func: norm(func.get_gradient_at(*args[-1])) ** 2)
+        super().__init__(epsilon, 1, lambda args, func: norm(func.value_and_gradient(args[-1])[1]) ** 2)
 
 
 class GradientRelativeBreakChecker(GradientAbsoluteBreakChecker):
     def __init__(self, epsilon: float):
         super().__init__(epsilon)
-        self._relativity_function = lambda x, func: norm(func.get_gradient_at(*x)) ** 2
+        self._relativity_function = lambda x, func: norm(func.value_and_gradient(x)[1]) ** 2
+
+
+class ValidationPlateauBreakChecker(BreakChecker):
+    def __init__(self, epsilon: float, patience: int = 3):
+        assert patience > 0
+        super().__init__(epsilon, 1,
+                         lambda _, func: ValidationPlateauBreakChecker.__get_improvement(func, patience))
+
+    @staticmethod
+    def __get_improvement(func: BatchAutomatedDerivableFunction, patience: int) -> float:
+        assert func.has_validation_objects()
+        losses = func.validation_losses
+        if len(losses) <= patience:
+            return float("inf")
+        return min(losses[:-patience]) - min(losses[-patience:])
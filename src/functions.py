@@ -1,8 +1,13 @@
-import copy
+import math
 import random
-from abc import ABC
-from typing import Callable, Sequence, override
-import src.utilities as utilities
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable, Sequence, override
+
+import numpy
+
+from src.utilities import soft_threshold
 
 """
 functions.py
@@ -12,10 +17,30 @@ Example of usage:
     my_function = DerivableFunction(lambda x, y: x ** 2 + y ** 2, (lambda x, y: 2 * x, lambda x, y: 2 * y))
     my_function.apply(1, 2) -> 5
     my_function.get_gradient_at(1, 2) -> (2, 4)
+
+Functions of many parameters take a single parameter vector instead:
+    my_function = VectorDerivableFunction(lambda w: w @ w, lambda w: 2 * w, 1000)
+    my_function.evaluate(numpy.ones(1000)) -> 1000
 """
 
 
+Dataset = Sequence[tuple[tuple[float, ...], float]] | tuple[numpy.ndarray | Any, numpy.ndarray]
+
+
+class GradientMode(Enum):
+    """
+    Estimators of the mini-batch gradient of BatchAutomatedDerivableFunction.
+    SVRG corrects it with the full gradient at a periodic snapshot, SAGA with a table of the last per-object gradients.
+    """
+    SGD = "sgd"
+    SVRG = "svrg"
+    SAGA = "saga"
+
+
 class Function:
+    # False for functions known only by their gradients, reports can not draw them
+    evaluable = True
+
     def __init__(self, function: Callable[..., float]):
         self.function = function
         self.tracking = False
@@ -26,6 +51,9 @@ class Function:
             self.times_used += 1
         return self.function(*args)
 
+    def evaluate(self, point: numpy.ndarray) -> float:
+        return self.apply(*point)
+
     def get_arg_count(self) -> int:
         return self.function.__code__.co_argcount
 
@@ -38,20 +66,140 @@ class Function:
     def get_call_data(self) -> dict[str, int]:
         return {"to_function": self.times_used}
 
+    def on_iteration(self, iteration_number: int, point: numpy.ndarray) -> None:
+        pass
+
+    def on_step(self, iteration_number: int, step: float) -> None:
+        """
+        Called by the optimizer with the length of the step it takes from the point of the iteration.
+        """
+        pass
+
+
+class VectorFunction(Function):
+    def __init__(self, function: Callable[[numpy.ndarray], float], dimension: int):
+        super().__init__(function)
+        self.dimension = dimension
+
+    @override
+    def apply(self, *args: float) -> float:
+        return self.evaluate(numpy.asarray(args, dtype=float))
+
+    @override
+    def evaluate(self, point: numpy.ndarray) -> float:
+        if self.tracking:
+            self.times_used += 1
+        return self.function(point)
+
+    @override
+    def get_arg_count(self) -> int:
+        return self.dimension
+
 
 class DirectionalFunction:
-    def __init__(self, function: Function, starting_point: tuple[float, ...], direction: tuple[float, ...]):
+    def __init__(self, function: Function, starting_point: numpy.ndarray, direction: numpy.ndarray,
+                 starting_value: float | None = None):
         self.function = function
         self.starting_point = starting_point
         self.direction = direction
+        self.evaluated: dict[float, float] = dict() if starting_value is None else {0: starting_value}
 
     def apply(self, coefficient: float) -> float:
-        return self.function.apply(*utilities.element_wise_addition(self.starting_point, self.direction, -coefficient))
+        if coefficient in self.evaluated:
+            return self.evaluated[coefficient]
+        value = self.function.evaluate(self.starting_point - coefficient * self.direction)
+        self.evaluated[coefficient] = value
+        return value
+
+
+class QuadraticDirectionalFunction(DirectionalFunction):
+    """
+    Restriction of a quadratic function to a line, slope and curvature are its first and second derivatives at 0.
+    """
+
+    def __init__(self, function: Function, starting_point: numpy.ndarray, direction: numpy.ndarray,
+                 starting_value: float, slope: float, curvature: float):
+        super().__init__(function, starting_point, direction, starting_value)
+        self.slope = slope
+        self.curvature = curvature
+
+    def get_minimizer(self) -> float:
+        if self.curvature <= 0:
+            return 0
+        return -self.slope / self.curvature
+
+
+class BatchedDirectionalFunction:
+    def __init__(self, function: "LockstepBatchFunction", starting_points: numpy.ndarray, directions: numpy.ndarray,
+                 starting_values: numpy.ndarray):
+        self.function = function
+        self.starting_points = starting_points
+        self.directions = directions
+        self.starting_values = starting_values
+
+    def get_problem_count(self) -> int:
+        return len(self.starting_points)
+
+    def apply(self, coefficients: numpy.ndarray) -> numpy.ndarray:
+        return self.function.apply_batch(self.starting_points - coefficients[:, None] * self.directions)
+
+    def get_problem(self, problem: int) -> DirectionalFunction:
+        return DirectionalFunction(
+            VectorFunction(lambda w: self.function.apply_problem_batch(problem, w), self.starting_points.shape[1]),
+            self.starting_points[problem], self.directions[problem], self.starting_values[problem])
+
+
+def get_finite_difference_gradient(function: Callable[[numpy.ndarray], float | numpy.ndarray],
+                                   point: numpy.ndarray, value: float | numpy.ndarray,
+                                   epsilon: float) -> numpy.ndarray:
+    """
+    point may hold several problems in its rows, function then returns a row of values for each of them.
+    """
+    gradient = numpy.empty(point.shape)
+    shifted = numpy.array(point, dtype=float)
+    for i in range(point.shape[-1]):
+        shifted[..., i] += epsilon
+        difference = numpy.asarray(function(shifted) - value)
+        gradient[..., i] = difference.reshape(point.shape[:-1] + (-1,)).sum(axis=-1) / epsilon
+        shifted[..., i] = point[..., i]
+    return gradient
+
+
+@dataclass
+class SimultaneousPerturbation:
+    """
+    SPSA gradient estimate: all coordinates are shifted at once by perturbation / (k + 1) ** decay at iteration k
+    in a random direction of ±1, so an estimate takes 2 * averaging evaluations regardless of the dimension.
+    """
+    perturbation: float = 0.1
+    decay: float = 0.101
+    averaging: int = 1
+
+    def __post_init__(self):
+        assert self.perturbation > 0 and self.decay >= 0 and self.averaging > 0
+
+    def get_perturbation(self, iteration_number: int) -> float:
+        return self.perturbation / (iteration_number + 1) ** self.decay
+
+    def estimate(self, function: Callable[[numpy.ndarray], float], point: numpy.ndarray,
+                 iteration_number: int) -> numpy.ndarray:
+        shift = self.get_perturbation(iteration_number)
+        gradient = numpy.zeros(len(point))
+        for _ in range(self.averaging):
+            delta = numpy.random.randint(0, 2, len(point)) * 2 - 1
+            gradient += (function(point + shift * delta) - function(point - shift * delta)) / (2 * shift) * delta
+        return gradient / self.averaging
 
 
 class HyperFunction(Function):
-    def __init__(self, function: Callable[[tuple[float, ...], float, ...], float]):
+    def __init__(self, function: Callable[[tuple[float, ...], float, ...], float], vectorized: bool = False):
+        """
+        With vectorized the function is also called on the whole dataset at once: obj[i] is then the column
+        of the i-th feature and the result the losses of all objects. Only elementwise losses may be vectorized,
+        a loss reducing over its object (e.g. numpy.mean(obj)) would reduce over the dataset instead.
+        """
         super().__init__(function)
+        self.vectorized = vectorized
         self.object = None
         self.property = None
 
@@ -68,25 +216,299 @@ class HyperFunction(Function):
     def get_arg_count(self):
         return super().get_arg_count() - 1
 
+    def apply_to_dataset(self, features: numpy.ndarray, marks: numpy.ndarray, point: numpy.ndarray) -> numpy.ndarray:
+        """
+        Returns the losses of all objects. Several problems can be stacked along the first axis of all arrays.
+        """
+        if point.ndim > 1:
+            if self.vectorized:
+                values = self.function(numpy.moveaxis(features, -1, 0), marks, *numpy.moveaxis(point, -1, 0)[..., None])
+                return numpy.broadcast_to(values, marks.shape)
+            return numpy.stack([self.apply_to_dataset(f, m, w) for f, m, w in zip(features, marks, point)])
+        if self.vectorized:
+            return numpy.broadcast_to(self.function(features.T, marks, *point), marks.shape)
+        return numpy.fromiter((self.function(obj, mark, *point) for obj, mark in zip(features, marks)),
+                              dtype=float, count=len(marks))
+
+    def get_dataset_gradient(self, features: numpy.ndarray, marks: numpy.ndarray, point: numpy.ndarray,
+                             losses: numpy.ndarray, epsilon: float) -> numpy.ndarray:
+        """
+        Returns the sum of gradients of the losses of all given objects.
+        """
+        return get_finite_difference_gradient(lambda w: self.apply_to_dataset(features, marks, w),
+                                              point, losses, epsilon)
+
+    def get_object_gradients(self, features: numpy.ndarray, marks: numpy.ndarray, point: numpy.ndarray,
+                             losses: numpy.ndarray, epsilon: float) -> numpy.ndarray:
+        """
+        Returns the gradients of the losses of all given objects, one in each row.
+        """
+        gradients = numpy.empty((len(marks), len(point)))
+        shifted = numpy.array(point, dtype=float)
+        for i in range(len(point)):
+            shifted[i] += epsilon
+            gradients[:, i] = (self.apply_to_dataset(features, marks, shifted) - losses) / epsilon
+            shifted[i] = point[i]
+        return gradients
+
+
+class VectorHyperFunction(HyperFunction):
+    """
+    Loss of a model with a parameter vector. function(features, marks, w) returns the losses of all objects,
+    features having an object in each row. gradient(features, marks, w), if given, returns the sum of their gradients.
+    To be optimized in lockstep, both must also accept several problems stacked along the first axis:
+    features (problems, objects, features), marks (problems, objects) and w (problems, parameters).
+    With an analytic gradient the model is computed in the precision of the features (e.g. float32),
+    the returned gradients are float64.
+    derivative(features, marks, w), if given, declares a linear model: it returns the derivative of the loss
+    of each object by its prediction x @ w, the gradient of an object being its features multiplied by it.
+    """
+
+    def __init__(self, function: Callable[[numpy.ndarray, numpy.ndarray, numpy.ndarray], numpy.ndarray],
+                 dimension: int,
+                 gradient: Callable[[numpy.ndarray, numpy.ndarray, numpy.ndarray], numpy.ndarray] | None = None,
+                 derivative: Callable[[numpy.ndarray, numpy.ndarray, numpy.ndarray], numpy.ndarray] | None = None):
+        super().__init__(function)
+        self.dimension = dimension
+        self.gradient = gradient
+        self.derivative = derivative
+
+    @override
+    def apply(self, *args: float) -> float:
+        if self.tracking:
+            self.times_used += 1
+        return float(self.function(numpy.atleast_2d(self.object), numpy.atleast_1d(self.property),
+                                   numpy.asarray(args, dtype=float))[0])
+
+    @override
+    def get_arg_count(self) -> int:
+        return self.dimension
+
+    @override
+    def apply_to_dataset(self, features: numpy.ndarray, marks: numpy.ndarray, point: numpy.ndarray) -> numpy.ndarray:
+        return self.function(features, marks, self.__to_features_precision(features, point))
+
+    def __to_features_precision(self, features: numpy.ndarray, point: numpy.ndarray) -> numpy.ndarray:
+        """
+        Finite differences need the point in float64, otherwise the shift may vanish.
+        """
+        if self.gradient is None or not numpy.issubdtype(features.dtype, numpy.floating):
+            return point
+        return point.astype(features.dtype, copy=False)
+
+    @override
+    def get_dataset_gradient(self, features: numpy.ndarray, marks: numpy.ndarray, point: numpy.ndarray,
+                             losses: numpy.ndarray, epsilon: float) -> numpy.ndarray:
+        if self.gradient is None:
+            return super().get_dataset_gradient(features, marks, point, losses, epsilon)
+        return numpy.asarray(self.gradient(features, marks, self.__to_features_precision(features, point)),
+                             dtype=numpy.float64)
+
+    def get_object_derivatives(self, features: numpy.ndarray, marks: numpy.ndarray,
+                               point: numpy.ndarray) -> numpy.ndarray:
+        """
+        Returns the derivatives of the losses of all objects by their predictions, only for a linear model.
+        """
+        return numpy.asarray(self.derivative(features, marks, point.astype(features.dtype, copy=False)),
+                             dtype=numpy.float64)
+
+    @override
+    def get_object_gradients(self, features: numpy.ndarray, marks: numpy.ndarray, point: numpy.ndarray,
+                             losses: numpy.ndarray, epsilon: float) -> numpy.ndarray:
+        if self.gradient is None:
+            return super().get_object_gradients(features, marks, point, losses, epsilon)
+        point = self.__to_features_precision(features, point)
+        return numpy.stack([self.gradient(features[j:j + 1], marks[j:j + 1], point)
+                            for j in range(len(marks))]).astype(numpy.float64)
+
+
+def is_sparse(features: Any) -> bool:
+    """
+    Recognizes scipy.sparse matrices without importing scipy.
+    """
+    return hasattr(features, "tocsr") and not isinstance(features, numpy.ndarray)
+
+
+def dataset_to_arrays(objects: Dataset, dtype: type = numpy.float64) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Returns the features (an object in each row) and the marks stored with the given precision.
+    Sparse features stay sparse in CSR format.
+    """
+    if len(objects) == 2 and isinstance(objects[1], numpy.ndarray):
+        if is_sparse(objects[0]):
+            return objects[0].tocsr().astype(dtype, copy=False), numpy.asarray(objects[1], dtype=dtype)
+        if isinstance(objects[0], numpy.ndarray):
+            return numpy.asarray(objects[0], dtype=dtype), numpy.asarray(objects[1], dtype=dtype)
+    features = numpy.array([obj for obj, _ in objects], dtype=dtype)
+    marks = numpy.array([mark for _, mark in objects], dtype=dtype)
+    return features, marks
+
 
 class DerivableFunction(Function):
+    __CACHE_SIZE = 2
+
     def __init__(self, function: Callable[..., float], gradient: tuple[Callable[..., float], ...]):
         super().__init__(function)
         self._gradient = gradient
         self.times_gradient_used = False
+        self.__evaluations: list[tuple[numpy.ndarray, tuple[float, numpy.ndarray]]] = []
 
     def get_gradient_at(self, *args: float) -> tuple[float, ...]:
         if self.tracking:
             self.times_gradient_used += 1
         return tuple(dF(*args) for dF in self._gradient)
 
+    def value_and_gradient(self, point: numpy.ndarray) -> tuple[float, numpy.ndarray]:
+        """
+        Returns the value and the gradient at the point, computing them at most once for each of the last points.
+        """
+        for evaluated_point, evaluation in self.__evaluations:
+            if evaluated_point is point:
+                return evaluation
+        evaluation = self._evaluate(numpy.asarray(point, dtype=float))
+        self.__evaluations.append((point, evaluation))
+        if len(self.__evaluations) > DerivableFunction.__CACHE_SIZE:
+            self.__evaluations.pop(0)
+        return evaluation
+
+    def _evaluate(self, point: numpy.ndarray) -> tuple[float, numpy.ndarray]:
+        return self.evaluate(point), numpy.asarray(self.get_gradient_at(*point), dtype=float)
+
     def get_call_data(self) -> dict[str, int]:
         result = super().get_call_data()
         result["to_gradient"] = self.times_gradient_used
         return result
 
-    def get_directional(self, point: tuple[float, ...]) -> DirectionalFunction:
-        return DirectionalFunction(self, point, self.get_gradient_at(*point))
+    def get_directional(self, point: numpy.ndarray) -> DirectionalFunction:
+        value, gradient = self.value_and_gradient(point)
+        return DirectionalFunction(self, point, gradient, value)
+
+    def get_hessian_product(self, point: numpy.ndarray, vector: numpy.ndarray,
+                            epsilon: float = 10 ** -5) -> numpy.ndarray:
+        """
+        Returns the product of the Hessian at the point and the vector by a finite difference of two gradients.
+        """
+        scale = float(numpy.linalg.norm(vector))
+        if scale == 0:
+            return numpy.zeros_like(vector, dtype=float)
+        shift = epsilon * (1 + float(numpy.linalg.norm(point)))
+        shifted_gradient = self._evaluate(point + (shift / scale) * vector)[1]
+        return (shifted_gradient - self.value_and_gradient(point)[1]) * (scale / shift)
+
+
+class VectorDerivableFunction(DerivableFunction):
+    def __init__(self, function: Callable[[numpy.ndarray], float], gradient: Callable[[numpy.ndarray], numpy.ndarray],
+                 dimension: int,
+                 hessian_product: Callable[[numpy.ndarray, numpy.ndarray], numpy.ndarray] | None = None):
+        """
+        hessian_product(w, v), if given, returns the exact product of the Hessian at w and the vector v.
+        """
+        super().__init__(function, ())
+        self.vector_gradient = gradient
+        self.dimension = dimension
+        self.hessian_product = hessian_product
+
+    @override
+    def apply(self, *args: float) -> float:
+        return self.evaluate(numpy.asarray(args, dtype=float))
+
+    @override
+    def evaluate(self, point: numpy.ndarray) -> float:
+        if self.tracking:
+            self.times_used += 1
+        return self.function(point)
+
+    @override
+    def get_gradient_at(self, *args: float) -> tuple[float, ...]:
+        if self.tracking:
+            self.times_gradient_used += 1
+        return tuple(self.vector_gradient(numpy.asarray(args, dtype=float)))
+
+    @override
+    def _evaluate(self, point: numpy.ndarray) -> tuple[float, numpy.ndarray]:
+        if self.tracking:
+            self.times_gradient_used += 1
+        return self.evaluate(point), numpy.asarray(self.vector_gradient(point), dtype=float)
+
+    @override
+    def get_hessian_product(self, point: numpy.ndarray, vector: numpy.ndarray,
+                            epsilon: float = 10 ** -5) -> numpy.ndarray:
+        if self.hessian_product is None:
+            return super().get_hessian_product(point, vector, epsilon)
+        return numpy.asarray(self.hessian_product(point, vector), dtype=float)
+
+    @override
+    def get_arg_count(self) -> int:
+        return self.dimension
+
+
+class RegularizedFunction(DerivableFunction):
+    """
+    Sum of a function and a differentiable regularizer. Call data and iterations are those of the function.
+    """
+
+    def __init__(self, function: DerivableFunction, regular_func: DerivableFunction):
+        super().__init__(function.function, ())
+        self.inner = function
+        self.regular_func = regular_func
+
+    @override
+    def apply(self, *args: float) -> float:
+        return self.evaluate(numpy.asarray(args, dtype=float))
+
+    @override
+    def evaluate(self, point: numpy.ndarray) -> float:
+        return self.inner.evaluate(point) + self.regular_func.evaluate(point)
+
+    @override
+    def _evaluate(self, point: numpy.ndarray) -> tuple[float, numpy.ndarray]:
+        value, gradient = self.inner.value_and_gradient(point)
+        regular_value, regular_gradient = self.regular_func.value_and_gradient(point)
+        return value + regular_value, gradient + regular_gradient
+
+    @override
+    def get_hessian_product(self, point: numpy.ndarray, vector: numpy.ndarray,
+                            epsilon: float = 10 ** -5) -> numpy.ndarray:
+        return (self.inner.get_hessian_product(point, vector, epsilon)
+                + self.regular_func.get_hessian_product(point, vector, epsilon))
+
+    @override
+    def get_directional(self, point: numpy.ndarray) -> DirectionalFunction:
+        """
+        The line search probes the restriction of the inner function (e.g. on its batch) plus the regularizer.
+        """
+        value, gradient = self.value_and_gradient(point)
+        inner = self.inner.get_directional(point)
+        restriction = VectorFunction(lambda w: inner.function.evaluate(w) + self.regular_func.evaluate(w), len(point))
+        if isinstance(inner, QuadraticDirectionalFunction):
+            return QuadraticDirectionalFunction(restriction, point, gradient, value, -float(gradient @ gradient),
+                                                float(gradient @ self.get_hessian_product(point, gradient)))
+        return DirectionalFunction(restriction, point, gradient, value)
+
+    @override
+    def get_arg_count(self) -> int:
+        return self.inner.get_arg_count()
+
+    @override
+    def start_tracking(self) -> None:
+        self.inner.start_tracking()
+
+    @override
+    def stop_tracking(self) -> None:
+        self.inner.stop_tracking()
+
+    @override
+    def get_call_data(self) -> dict[str, int]:
+        return self.inner.get_call_data()
+
+    @override
+    def on_iteration(self, iteration_number: int, point: numpy.ndarray) -> None:
+        self.inner.on_iteration(iteration_number, point)
+
+    @override
+    def on_step(self, iteration_number: int, step: float) -> None:
+        self.inner.on_step(iteration_number, step)
+
 
 class AutomatedDerivableFunction(DerivableFunction):
     @staticmethod
@@ -94,78 +516,405 @@ class AutomatedDerivableFunction(DerivableFunction):
         x_shift = x[:coord] + (x[coord] + epsilon,) + x[coord + 1:]
         return (function.apply(*x_shift) - function.apply(*x)) / epsilon
 
-    def __init__(self, function: Function, derivable_start: bool = True, epsilon: float = 10 ** -8):
+    def __init__(self, function: Function, derivable_start: bool = True, epsilon: float = 10 ** -8,
+                 perturbation: SimultaneousPerturbation | None = None):
+        """
+        With perturbation the gradient is estimated by SPSA instead of finite differences along every coordinate.
+        """
         super().__init__(function.apply,
                          tuple(
                              lambda *x: AutomatedDerivableFunction._get_partial(function, x, i, epsilon)
                              for i in range(function.get_arg_count()))
                          if derivable_start else ())
         self.__arg_count = function.get_arg_count()
+        self.__source = function
+        self.__epsilon = epsilon
+        self.perturbation = perturbation
+        self.iteration_number = 0
+
+    @override
+    def on_iteration(self, iteration_number: int, point: numpy.ndarray) -> None:
+        self.iteration_number = iteration_number
 
     def get_arg_count(self) -> int:
         return self.__arg_count
 
+    @override
+    def evaluate(self, point: numpy.ndarray) -> float:
+        if self.tracking:
+            self.times_used += 1
+        return self.__source.evaluate(point)
+
+    @override
+    def _evaluate(self, point: numpy.ndarray) -> tuple[float, numpy.ndarray]:
+        value = self.evaluate(point)
+        if self.tracking:
+            self.times_gradient_used += 1
+        if self.perturbation is not None:
+            return value, self.perturbation.estimate(self.__source.evaluate, point, self.iteration_number)
+        return value, get_finite_difference_gradient(self.__source.evaluate, point, value, self.__epsilon)
+
 
 class BatchAutomatedDerivableFunction(AutomatedDerivableFunction):
-    def __init__(self, function: HyperFunction, objects: Sequence[tuple[tuple[float, ...], float]],
-                 batch_size: int, regular_func: DerivableFunction, epsilon: float = 10 ** -8):
-        super().__init__(function, False)
+    def __init__(self, function: HyperFunction, objects: Dataset,
+                 batch_size: int, regular_func: DerivableFunction, epsilon: float = 10 ** -8,
+                 validation_objects: Dataset = (), validation_interval: int = 1,
+                 gradient_mode: GradientMode = GradientMode.SGD, snapshot_interval: int | None = None,
+                 perturbation: SimultaneousPerturbation | None = None, dtype: type = numpy.float64,
+                 lazy_regularization: bool = False):
+        """
+        snapshot_interval is the number of iterations between SVRG snapshots, one pass over the objects by default.
+        With perturbation the batch gradient is estimated by SPSA, only in GradientMode.SGD.
+        dtype is the precision the objects (and the SAGA table) are stored with, e.g. numpy.float32 to halve
+        the memory traffic; parameters, losses and gradients are always accumulated in float64.
+        The SAGA table holds a gradient of every object, objects * parameters numbers. For a linear
+        VectorHyperFunction (with derivative) it holds one derivative per object instead.
+        A full pass over the objects (an SVRG snapshot, filling the SAGA table) counts in times_used
+        as the number of batches it covers, the gradient at the SVRG snapshot as one more batch.
+        Features may be a scipy.sparse matrix (with a VectorHyperFunction), batches are then sparse as well.
+        With lazy_regularization the regularizer (an L2) only acts on the weights of the features present
+        in the batch, see __catch_up; the other weights get its decay when they are present next time.
+        """
+        assert validation_interval > 0
+        assert snapshot_interval is None or snapshot_interval > 0
+        assert perturbation is None or gradient_mode is GradientMode.SGD
+        super().__init__(function, False, perturbation=perturbation)
         self.objects = objects
         self.function = function
         self.epsilon = epsilon
         self.batch_size = batch_size
-        self.batch_choices = list(range(len(objects)))
         self.regular_func = regular_func
+        self.validation_interval = validation_interval
+        self.validation_losses: list[float] = []
+        self.dtype = dtype
+        validation_arrays = dataset_to_arrays(validation_objects, dtype)
+        self.__validation_arrays = validation_arrays if len(validation_arrays[1]) > 0 else None
+        self.__objects_arrays = dataset_to_arrays(objects, dtype)
+        assert not is_sparse(self.__objects_arrays[0]) or isinstance(function, VectorHyperFunction)
+        assert not lazy_regularization or isinstance(regular_func, L2)
+        self.lazy_regularization = lazy_regularization
+        self.__log_decay = 0.0
+        self.__caught_up: numpy.ndarray | None = None
+        self.__present: numpy.ndarray | None = None
+        self.batch_choices = list(range(len(self.__objects_arrays[1])))
+        self.gradient_mode = gradient_mode
+        self.snapshot_interval = snapshot_interval if snapshot_interval is not None else math.ceil(
+            len(self.batch_choices) / batch_size)
+        self.__snapshot: numpy.ndarray | None = None
+        self.__snapshot_gradient: numpy.ndarray | None = None
+        self.__gradient_table: numpy.ndarray | None = None
+        self.__compact_table = isinstance(function, VectorHyperFunction) and function.derivative is not None
+        self.__gradient_table_mean: numpy.ndarray | None = None
         self.__new_batch()
 
-    def get_batch_gradient_at(self, object_numbers: list[int], hyper_parameters: tuple[float, ...]) -> (
-            tuple)[float, ...]:
+    def get_dataset_loss(self, point: numpy.ndarray, arrays: tuple[numpy.ndarray, numpy.ndarray]) -> float:
+        features, marks = arrays
+        losses = self.function.apply_to_dataset(features, marks, numpy.asarray(point, dtype=float))
+        return float(numpy.mean(losses, dtype=numpy.float64))
+
+    def get_training_loss(self, point: numpy.ndarray) -> float:
+        return self.get_dataset_loss(point, self.__objects_arrays)
+
+    def get_objects_arrays(self) -> tuple[numpy.ndarray, numpy.ndarray]:
+        return self.__objects_arrays
+
+    def has_validation_objects(self) -> bool:
+        """
+        Validation losses are recorded only when there are validation objects.
+        """
+        return self.__validation_arrays is not None
+
+    def get_validation_loss(self, point: numpy.ndarray) -> float:
+        if self.__validation_arrays is None:
+            return self.get_training_loss(point)
+        return self.get_dataset_loss(point, self.__validation_arrays)
+
+    @override
+    def on_iteration(self, iteration_number: int, point: numpy.ndarray) -> None:
+        super().on_iteration(iteration_number, point)
+        if self.__validation_arrays is not None and iteration_number % self.validation_interval == 0:
+            self.validation_losses.append(self.get_validation_loss(point))
+        if self.gradient_mode is GradientMode.SVRG and iteration_number % self.snapshot_interval == 0:
+            self.__take_snapshot(point)
+
+    def __get_pass_cost(self) -> int:
+        return math.ceil(len(self.batch_choices) / self.batch_size)
+
+    def __get_objects_mean_gradient(self, point: numpy.ndarray) -> numpy.ndarray:
+        self.times_used += self.__get_pass_cost()
+        features, marks = self.__objects_arrays
+        losses = self.function.apply_to_dataset(features, marks, point)
+        return self.function.get_dataset_gradient(features, marks, point, losses, self.epsilon) / len(marks)
+
+    def __take_snapshot(self, point: numpy.ndarray) -> None:
+        self.__snapshot = numpy.array(point, dtype=float)
+        self.__snapshot_gradient = self.__get_objects_mean_gradient(self.__snapshot)
+
+    def __fill_gradient_table(self, point: numpy.ndarray) -> None:
+        self.times_used += self.__get_pass_cost()
+        features, marks = self.__objects_arrays
+        if self.__compact_table:
+            self.__gradient_table = self.function.get_object_derivatives(features, marks, point).astype(self.dtype)
+            self.__gradient_table_mean = numpy.asarray(
+                features.T @ self.__gradient_table.astype(numpy.float64), dtype=numpy.float64) / len(marks)
+            return
+        losses = self.function.apply_to_dataset(features, marks, point)
+        gradients = self.function.get_object_gradients(features, marks, point, losses, self.epsilon)
+        self.__gradient_table = gradients.astype(self.dtype)
+        self.__gradient_table_mean = self.__gradient_table.mean(axis=0, dtype=numpy.float64)
+
+    def __estimate_compact_saga_gradient(self, batch_numbers: list[int], features: numpy.ndarray,
+                                         marks: numpy.ndarray, point: numpy.ndarray) -> numpy.ndarray:
+        """
+        SAGA for a linear model, the table holds the derivative of the loss of each object by its prediction.
+        """
+        derivatives = self.function.get_object_derivatives(features, marks, point)
+        previous = self.__gradient_table[batch_numbers].astype(numpy.float64)
+        stored = derivatives.astype(self.dtype)
+        self.__gradient_table[batch_numbers] = stored
+        change = numpy.asarray(features.T @ (derivatives - previous), dtype=numpy.float64)
+        estimate = change + len(batch_numbers) * self.__gradient_table_mean
+        self.__gradient_table_mean += numpy.asarray(features.T @ (stored.astype(numpy.float64) - previous),
+                                                    dtype=numpy.float64) / len(self.batch_choices)
+        return estimate
+
+    def __estimate_gradient(self, batch_numbers: list[int], features: numpy.ndarray, marks: numpy.ndarray,
+                            point: numpy.ndarray, losses: numpy.ndarray) -> numpy.ndarray:
+        """
+        Returns an unbiased estimate of the sum of gradients over a batch of the objects.
+        """
+        match self.gradient_mode:
+            case GradientMode.SVRG:
+                if self.__snapshot is None:
+                    self.__take_snapshot(point)
+                snapshot_losses = self.function.apply_to_dataset(features, marks, self.__snapshot)
+                correction = self.function.get_dataset_gradient(features, marks, self.__snapshot, snapshot_losses,
+                                                                self.epsilon)
+                gradient = self.function.get_dataset_gradient(features, marks, point, losses, self.epsilon)
+                self.times_used += 1
+                return gradient - correction + len(batch_numbers) * self.__snapshot_gradient
+            case GradientMode.SAGA:
+                if self.__gradient_table is None:
+                    self.__fill_gradient_table(point)
+                if self.__compact_table:
+                    return self.__estimate_compact_saga_gradient(batch_numbers, features, marks, point)
+                gradients = self.function.get_object_gradients(features, marks, point, losses, self.epsilon)
+                previous = self.__gradient_table[batch_numbers]
+                estimate = (gradients - previous).sum(axis=0) + len(batch_numbers) * self.__gradient_table_mean
+                stored = gradients.astype(self.dtype)
+                self.__gradient_table[batch_numbers] = stored
+                self.__gradient_table_mean += (stored - previous).sum(axis=0, dtype=numpy.float64) / len(
+                    self.batch_choices)
+                return estimate
+            case _ if self.perturbation is not None:
+                return self.perturbation.estimate(
+                    lambda w: float(numpy.sum(self.function.apply_to_dataset(features, marks, w), dtype=numpy.float64)),
+                    point, self.iteration_number)
+            case _:
+                return self.function.get_dataset_gradient(features, marks, point, losses, self.epsilon)
+
+    def get_batch_gradient_at(self, object_numbers: list[int], hyper_parameters: numpy.ndarray) -> numpy.ndarray:
+        return self.__evaluate_batch(object_numbers, numpy.asarray(hyper_parameters, dtype=float))[1]
+
+    def __evaluate_batch(self, batch_numbers: list[int], point: numpy.ndarray) -> tuple[float, numpy.ndarray]:
         if self.tracking:
             self.times_gradient_used += 1
-        gradients = []
-        for i in object_numbers:
-            self.function.set_object(self.objects[i][0], self.objects[i][1])
-            gradient_for_object = tuple(
-                AutomatedDerivableFunction._get_partial(self.function, hyper_parameters, j, self.epsilon)
-                for j in range(len(hyper_parameters)))
-            gradients.append(gradient_for_object)
-        gradients.append(self.regular_func.get_gradient_at(*hyper_parameters))
-        return tuple(sum(elements) for elements in zip(*gradients))
+        self.times_used += 1
+        features, marks = self.__objects_arrays[0][batch_numbers], self.__objects_arrays[1][batch_numbers]
+        present = None
+        if self.lazy_regularization:
+            present = self.__get_present(features, len(point))
+            self.__catch_up(point, present)
+            self.__present = present
+        losses = self.function.apply_to_dataset(features, marks, point)
+        gradient = self.__estimate_gradient(batch_numbers, features, marks, point, losses)
+        loss = float(numpy.sum(losses, dtype=numpy.float64)) / max(len(batch_numbers), 1)
+        if present is None:
+            regular_value, regular_gradient = self.regular_func.value_and_gradient(point)
+            return loss + regular_value, gradient + regular_gradient
+        gradient[present] += self.regular_func.lamda * point[present]
+        return loss + self.regular_func.evaluate(point), gradient
+
+    @staticmethod
+    def __get_present(features: numpy.ndarray, dimension: int) -> numpy.ndarray:
+        """
+        Numbers of the weights of the features present in the batch, they are matched to the last feature columns,
+        the leading weights (e.g. the intercept) are always present. A number may repeat.
+        """
+        leading = dimension - features.shape[1]
+        if is_sparse(features):
+            columns = features.indices
+        else:
+            columns = numpy.flatnonzero(numpy.any(features != 0, axis=0))
+        return numpy.concatenate((numpy.arange(leading), columns + leading))
+
+    @override
+    def on_step(self, iteration_number: int, step: float) -> None:
+        if self.lazy_regularization:
+            assert abs(step) * self.regular_func.lamda < 1
+            self.__log_decay += math.log1p(-abs(step) * self.regular_func.lamda)
+            # the gradient of the step has decayed the weights present in its batch already
+            self.__caught_up[self.__present] = self.__log_decay
+
+    def __catch_up(self, point: numpy.ndarray, numbers: numpy.ndarray | slice) -> None:
+        """
+        Multiplies the given weights of the point, in place, by the L2 decay (1 - step * lamda) of every step
+        taken since they were caught up last time, so they are up to date before the step from the point.
+        """
+        if self.__caught_up is None:
+            self.__caught_up = numpy.zeros(len(point))
+        point[numbers] *= numpy.exp(self.__log_decay - self.__caught_up[numbers])
+        self.__caught_up[numbers] = self.__log_decay
+
+    def catch_up(self, point: numpy.ndarray) -> None:
+        """
+        Brings all the weights of the point up to date with lazy_regularization, e.g. the last point of a report.
+        """
+        if self.lazy_regularization:
+            self.__catch_up(point, slice(None))
 
     def __new_batch(self):
         self.batch_choice = random.sample(self.batch_choices, self.batch_size)
 
     @override
     def apply(self, *args: float) -> float:
+        return self.evaluate(numpy.asarray(args, dtype=float))
+
+    @override
+    def evaluate(self, point: numpy.ndarray) -> float:
         self.__new_batch()
-        return self.__apply_batch(self.batch_choice, args)
+        return self.__apply_batch(self.batch_choice, point)
 
-    def __apply_batch(self, batch_numbers: list[int], point: tuple[float, ...]) -> float:
-        result = 0
+    def __apply_batch(self, batch_numbers: list[int], point: numpy.ndarray) -> float:
         self.times_used += 1
-        for batch_num in batch_numbers:
-            self.function.set_object(self.objects[batch_num][0], self.objects[batch_num][1])
-            result += self.function.apply(*point)
-        return result / max(len(batch_numbers), 1) + self.regular_func.apply(*point)
+        features, marks = self.__objects_arrays[0][batch_numbers], self.__objects_arrays[1][batch_numbers]
+        result = float(numpy.sum(self.function.apply_to_dataset(features, marks, point), dtype=numpy.float64))
+        return result / max(len(batch_numbers), 1) + self.regular_func.evaluate(point)
+
+    @override
+    def _evaluate(self, point: numpy.ndarray) -> tuple[float, numpy.ndarray]:
+        self.__new_batch()
+        return self.__evaluate_batch(self.batch_choice, point)
 
     @override
     def get_gradient_at(self, *args: float) -> tuple[float, ...]:
+        return tuple(self.value_and_gradient(numpy.asarray(args, dtype=float))[1])
+
+    @override
+    def get_directional(self, point: numpy.ndarray) -> DirectionalFunction:
+        value, gradient = self.value_and_gradient(point)
+        batch = self.batch_choice
+        return DirectionalFunction(VectorFunction(lambda w: self.__apply_batch(batch, w), len(point)),
+                                   point, gradient, value)
+
+
+class LockstepBatchFunction(DerivableFunction):
+    """
+    Mini-batch losses of several independent problems with the same loss, regularizer and batch size.
+    Points are matrices with the parameters of a problem in each row, only the selected problems are evaluated.
+    """
+
+    def __init__(self, problems: Sequence[BatchAutomatedDerivableFunction]):
+        first = problems[0]
+        super().__init__(first.function.function, ())
+        self.problems = problems
+        arrays = [problem.get_objects_arrays() for problem in problems]
+        assert not any(is_sparse(features) for features, _ in arrays)
+        self.counts = numpy.array([len(marks) for _, marks in arrays])
+        assert 0 < first.batch_size <= self.counts.min()
+        self.features = numpy.zeros((len(arrays), self.counts.max(), arrays[0][0].shape[1]), dtype=first.dtype)
+        self.marks = numpy.zeros((len(arrays), self.counts.max()), dtype=first.dtype)
+        for k, (features, marks) in enumerate(arrays):
+            self.features[k, :len(marks)] = features
+            self.marks[k, :len(marks)] = marks
+        self.hyper_function = first.function
+        self.batch_size = first.batch_size
+        self.regular_func = first.regular_func
+        self.epsilon = first.epsilon
+        self.__times_used = numpy.zeros(len(problems), dtype=int)
+        self.__times_gradient_used = numpy.zeros(len(problems), dtype=int)
+        self.__selected = numpy.arange(len(problems))
+        self.__batch = None
+        self.__point_batches: list[tuple[numpy.ndarray, numpy.ndarray]] = []
+
+    @override
+    def get_arg_count(self) -> int:
+        return self.problems[0].get_arg_count()
+
+    def get_problem_count(self) -> int:
+        return len(self.problems)
+
+    def select(self, problems: numpy.ndarray) -> None:
+        self.__selected = problems
+        self.__batch = None
+        self.__point_batches = []
+
+    @override
+    def stop_tracking(self) -> None:
+        super().stop_tracking()
+        for problem, times_used, times_gradient_used in zip(self.problems, self.__times_used,
+                                                             self.__times_gradient_used):
+            problem.times_used += int(times_used)
+            problem.times_gradient_used += int(times_gradient_used)
+        self.__times_used[:] = 0
+        self.__times_gradient_used[:] = 0
+
+    def __new_batch(self) -> None:
+        keys = numpy.random.random((len(self.__selected), self.marks.shape[1]))
+        keys[numpy.arange(self.marks.shape[1]) >= self.counts[self.__selected, None]] = numpy.inf
+        self.__batch = numpy.argpartition(keys, self.batch_size - 1, axis=1)[:, :self.batch_size]
+
+    def __get_batch_arrays(self) -> tuple[numpy.ndarray, numpy.ndarray]:
+        rows = self.__selected[:, None]
+        return self.features[rows, self.__batch], self.marks[rows, self.__batch]
+
+    def apply_batch(self, points: numpy.ndarray) -> numpy.ndarray:
+        if self.tracking:
+            self.__times_used[self.__selected] += 1
+        features, marks = self.__get_batch_arrays()
+        losses = self.hyper_function.apply_to_dataset(features, marks, points)
+        return losses.sum(axis=-1, dtype=numpy.float64) / self.batch_size + self.regular_func.evaluate(points)
+
+    def apply_problem_batch(self, problem: int, point: numpy.ndarray) -> float:
+        if self.tracking:
+            self.__times_used[self.__selected[problem]] += 1
+        row, batch = self.__selected[problem], self.__batch[problem]
+        losses = self.hyper_function.apply_to_dataset(self.features[row, batch], self.marks[row, batch], point)
+        return float(numpy.sum(losses, dtype=numpy.float64)) / self.batch_size + self.regular_func.evaluate(point)
+
+    @override
+    def evaluate(self, point: numpy.ndarray) -> numpy.ndarray:
         self.__new_batch()
-        eg = self.get_batch_gradient_at(self.batch_choice, args)
-        rg = self.regular_func.get_gradient_at(*args)
-        return tuple(sum(elements) for elements in zip(eg, rg))
+        return self.apply_batch(point)
 
     @override
-    def get_directional(self, point: tuple[float, ...]) -> DirectionalFunction:
-        to_result = Function(lambda *x: self.__apply_batch(copy.deepcopy(self.batch_choice), x))
-        grad = self.get_batch_gradient_at(self.batch_choice, point)
-        return DirectionalFunction(to_result, point, grad)
+    def _evaluate(self, point: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]:
+        self.__new_batch()
+        self.__point_batches = [(point, self.__batch)] + self.__point_batches[:1]
+        if self.tracking:
+            self.__times_used[self.__selected] += 1
+            self.__times_gradient_used[self.__selected] += 1
+        features, marks = self.__get_batch_arrays()
+        losses = self.hyper_function.apply_to_dataset(features, marks, point)
+        gradient = self.hyper_function.get_dataset_gradient(features, marks, point, losses, self.epsilon)
+        regular_value, regular_gradient = self.regular_func.value_and_gradient(point)
+        return losses.sum(axis=-1, dtype=numpy.float64) / self.batch_size + regular_value, gradient + regular_gradient
 
+    def get_training_losses(self, points: numpy.ndarray) -> numpy.ndarray:
+        losses = self.hyper_function.apply_to_dataset(self.features, self.marks, points)
+        losses = numpy.where(numpy.arange(self.marks.shape[1]) < self.counts[:, None], losses, 0)
+        return losses.sum(axis=-1, dtype=numpy.float64) / self.counts
 
-class L(DerivableFunction, ABC):
-    def __init__(self, arg_count: int, lamda: float, function: Callable[..., float],
-                 gradient: tuple[Callable[..., float], ...]):
-        super().__init__(function, gradient)
+    @override
+    def get_directional(self, point: numpy.ndarray) -> BatchedDirectionalFunction:
+        value, gradient = self.value_and_gradient(point)
+        self.__batch = next(batch for evaluated, batch in self.__point_batches if evaluated is point)
+        return BatchedDirectionalFunction(self, point, gradient, value)
+
+
+class L(VectorDerivableFunction, ABC):
+    def __init__(self, arg_count: int, lamda: float):
+        super().__init__(self._get_value, self._get_gradient, arg_count)
         self.arg_count = arg_count
         self.lamda = lamda
 
@@ -173,17 +922,64 @@ class L(DerivableFunction, ABC):
     def get_arg_count(self) -> int:
         return self.arg_count
 
+    @abstractmethod
+    def _get_value(self, w: numpy.ndarray) -> float:
+        pass
+
+    @abstractmethod
+    def _get_gradient(self, w: numpy.ndarray) -> numpy.ndarray:
+        pass
+
+    def get_smooth_part(self) -> "L":
+        """
+        The differentiable part of the regularizer, the rest of it is applied by prox.
+        """
+        return self
+
+    def get_nonsmooth_part(self) -> "L":
+        """
+        The rest of the regularizer, whose smooth part is zero and prox is that of the whole regularizer.
+        """
+        return L2(self.arg_count, 0)
+
+    def prox(self, w: numpy.ndarray, step: float | numpy.ndarray) -> numpy.ndarray:
+        """
+        Proximal operator of the non-differentiable part for the given step, w may hold a point in each row.
+        """
+        return w
+
+    def _shrink(self, w: numpy.ndarray, step: float | numpy.ndarray) -> numpy.ndarray:
+        result = numpy.array(w, dtype=float)
+        result[..., 1:] = soft_threshold(w[..., 1:], numpy.asarray(step)[..., None] * self.lamda / 2)
+        return result
+
 
 class L2(L):
-    def __init__(self, arg_count: int, lamda: float):
-        super().__init__(arg_count, lamda, (lambda *args: (lamda * sum(map((lambda x: x ** 2), args[1:]))) / 2),
-                         tuple((lambda *w: lamda * w[i]) for i in range(arg_count)))
+    def _get_value(self, w: numpy.ndarray) -> float:
+        return self.lamda * numpy.sum(w[..., 1:] ** 2, axis=-1) / 2
+
+    def _get_gradient(self, w: numpy.ndarray) -> numpy.ndarray:
+        return self.lamda * w
 
 
 class L1(L):
-    def __init__(self, arg_count: int, lamda: float):
-        super().__init__(arg_count, lamda, (lambda *args: (lamda * sum(map((lambda x: abs(x)), args[1:]))) / 2),
-                         tuple((lambda *w: lamda * L1.sign(w[i])) for i in range(arg_count)))
+    def _get_value(self, w: numpy.ndarray) -> float:
+        return self.lamda * numpy.sum(numpy.abs(w[..., 1:]), axis=-1) / 2
+
+    def _get_gradient(self, w: numpy.ndarray) -> numpy.ndarray:
+        return self.lamda * numpy.sign(w)
+
+    @override
+    def get_smooth_part(self) -> L:
+        return L2(self.arg_count, 0)
+
+    @override
+    def get_nonsmooth_part(self) -> L:
+        return self
+
+    @override
+    def prox(self, w: numpy.ndarray, step: float | numpy.ndarray) -> numpy.ndarray:
+        return self._shrink(w, step)
 
     @staticmethod
     def sign(a: int) -> int:
@@ -193,10 +989,89 @@ class L1(L):
             return 0
         return 1
 
+
 class Elastic(L):
-    def __init__(self, arg_count: int, lamda: float):
-        super().__init__(arg_count, lamda, (lambda *args: (lamda * sum(map((lambda x: x ** 2 + abs(x)), args[1:]))) / 2),
-                         tuple((lambda *w: lamda * w[i] * L1.sign(w[i])) for i in range(arg_count)))
+    def _get_value(self, w: numpy.ndarray) -> float:
+        return self.lamda * numpy.sum(w[..., 1:] ** 2 + numpy.abs(w[..., 1:]), axis=-1) / 2
+
+    def _get_gradient(self, w: numpy.ndarray) -> numpy.ndarray:
+        return self.lamda * w * numpy.sign(w)
+
+    @override
+    def get_smooth_part(self) -> L:
+        return L2(self.arg_count, self.lamda)
+
+    @override
+    def get_nonsmooth_part(self) -> L:
+        return L1(self.arg_count, self.lamda)
+
+    @override
+    def prox(self, w: numpy.ndarray, step: float | numpy.ndarray) -> numpy.ndarray:
+        return self._shrink(w, step)
+
+
+class LinearLeastSquaresFunction(VectorDerivableFunction):
+    """
+    Mean squared error of the linear model w0 + w1 * x1 + ... + wn * xn on the whole dataset, optionally with L2.
+    XᵀX, Xᵀy and yᵀy are computed once, so the value and the gradient cost O(n²) for n weights
+    regardless of the number of objects. They are computed for the features and the marks centred by their means,
+    otherwise large means cancel in the value: the residual is split into the centred one and its mean
+    w0 + mean(x) @ w1.. - mean(y), which are orthogonal.
+    """
+
+    def __init__(self, objects: Dataset, regular_func: L2 | None = None):
+        features, marks = dataset_to_arrays(objects)
+        super().__init__(self._get_value, self._get_gradient, features.shape[1] + 1)
+        self.regular_func = regular_func
+        self.objects_count = len(marks)
+        self.features_mean = features.mean(axis=0)
+        self.marks_mean = float(marks.mean())
+        centred_features, centred_marks = features - self.features_mean, marks - self.marks_mean
+        self.gram = centred_features.T @ centred_features
+        self.moments = centred_features.T @ centred_marks
+        self.marks_square = float(centred_marks @ centred_marks)
+
+    def _get_value(self, w: numpy.ndarray) -> float:
+        return self.__get_value(w, self.gram @ w[1:])
+
+    def _get_gradient(self, w: numpy.ndarray) -> numpy.ndarray:
+        return self.__get_gradient(w, self.gram @ w[1:])
+
+    def __get_residual_mean(self, w: numpy.ndarray) -> float:
+        return float(w[0] + self.features_mean @ w[1:] - self.marks_mean)
+
+    def __get_value(self, w: numpy.ndarray, gram_w: numpy.ndarray) -> float:
+        value = ((w[1:] @ gram_w - 2 * self.moments @ w[1:] + self.marks_square) / self.objects_count
+                 + self.__get_residual_mean(w) ** 2)
+        return float(value) + (0 if self.regular_func is None else self.regular_func.evaluate(w))
+
+    def __get_gradient(self, w: numpy.ndarray, gram_w: numpy.ndarray) -> numpy.ndarray:
+        residual_mean = self.__get_residual_mean(w)
+        gradient = numpy.concatenate(([2 * residual_mean], 2 * (gram_w - self.moments) / self.objects_count
+                                      + 2 * residual_mean * self.features_mean))
+        return gradient if self.regular_func is None else gradient + self.regular_func.value_and_gradient(w)[1]
+
+    @override
+    def get_hessian_product(self, point: numpy.ndarray, vector: numpy.ndarray,
+                            epsilon: float = 10 ** -5) -> numpy.ndarray:
+        mean_product = vector[0] + self.features_mean @ vector[1:]
+        product = 2 * numpy.concatenate(([mean_product], self.gram @ vector[1:] / self.objects_count
+                                         + mean_product * self.features_mean))
+        return product if self.regular_func is None else product + self.regular_func.lamda * vector
+
+    @override
+    def _evaluate(self, point: numpy.ndarray) -> tuple[float, numpy.ndarray]:
+        if self.tracking:
+            self.times_used += 1
+            self.times_gradient_used += 1
+        gram_w = self.gram @ point[1:]
+        return self.__get_value(point, gram_w), self.__get_gradient(point, gram_w)
+
+    @override
+    def get_directional(self, point: numpy.ndarray) -> QuadraticDirectionalFunction:
+        value, gradient = self.value_and_gradient(point)
+        return QuadraticDirectionalFunction(self, point, gradient, value, -float(gradient @ gradient),
+                                            float(gradient @ self.get_hessian_product(point, gradient)))
 
 
 class NoiseFunction(Function):
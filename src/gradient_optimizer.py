@@ -1,39 +1,168 @@
+import math
+
+import numpy
+
 from src.break_checker import BreakChecker
-from src.functions import DerivableFunction
+from src.functions import DerivableFunction, LockstepBatchFunction, L, RegularizedFunction
 from src.report import Report
 from src.scheduler import Scheduler
-import src.utilities as utilities
+
+
+class History:
+    """
+    Limits a trajectory to its starting point and the last limit points, all of them are kept with limit None.
+    """
+
+    def __init__(self, limit: int | None):
+        assert limit is None or limit >= 2
+        self.limit = limit
+
+    def trim(self, tracking: list, values: list | None = None) -> None:
+        """
+        Called after a point is appended, the values at the points are dropped together with them.
+        """
+        if self.limit is not None and len(tracking) > self.limit + 1:
+            del tracking[1]
+            if values is not None:
+                del values[1]
 
 
 class GradientOptimizer:
-    def __init__(self, scheduler: Scheduler, break_checker: BreakChecker, limit: int):
+    def __init__(self, scheduler: Scheduler, break_checker: BreakChecker, limit: int, history: int | None = None,
+                 accelerated: bool = False):
+        """
+        history limits the number of last points kept in the report, the starting point is always kept.
+        accelerated enables Nesterov momentum, which gives FISTA together with a regularizer applied by prox.
+        """
         self.__scheduler = scheduler
         self.__break_checker = break_checker
         self.__limit = limit
+        self.__history = History(history)
+        self.__accelerated = accelerated
 
-    def optimize(self, func: DerivableFunction, starting_point: tuple[float, ...] | None = None) -> Report:
+    def optimize(self, func: DerivableFunction, starting_point: tuple[float, ...] | None = None,
+                 regular_func: L | None = None) -> Report:
+        """
+        If regular_func is given, func + regular_func is minimized: its smooth part is added to func and the rest
+        is applied by its proximal operator after every gradient step (proximal gradient descent).
+        """
+        nonsmooth_func = None
+        if regular_func is not None:
+            if regular_func.get_smooth_part().lamda != 0:
+                func = RegularizedFunction(func, regular_func.get_smooth_part())
+            nonsmooth_func = regular_func.get_nonsmooth_part()
         func.start_tracking()
+        self.__scheduler.reset()
 
         multiplier = -1
 
         if starting_point is None:
-            current_point: tuple[float, ...] = tuple([0] * func.get_arg_count())
+            current_point: numpy.ndarray = numpy.zeros(func.get_arg_count())
         else:
-            current_point: tuple[float, ...] = starting_point
-        tracking: list[tuple[float, ...]] = [current_point]
+            current_point: numpy.ndarray = numpy.array(starting_point, dtype=float)
+        previous_point = current_point
+        momentum = 1
+        tracking: list[numpy.ndarray] = [current_point]
+        values: list[float | None] = []
 
         it = 0
+        func.on_iteration(it, current_point)
 
         while (not self.__break_checker.is_done(tracking, func)) and it < self.__limit:
-            gradient = func.get_gradient_at(*current_point)
-            current_point = (
-                utilities.element_wise_addition(
-                    current_point, gradient,
-                    multiplier * self.__scheduler.get_step_value(it, func.get_directional(current_point))
-                )
-            )
+            search_point = current_point
+            if self.__accelerated:
+                next_momentum = (1 + math.sqrt(1 + 4 * momentum ** 2)) / 2
+                if momentum > 1:
+                    search_point = current_point + (momentum - 1) / next_momentum * (current_point - previous_point)
+                momentum = next_momentum
+            value, gradient = func.value_and_gradient(search_point)
+            if search_point is not current_point:
+                values.append(None)
+            else:
+                values.append(value if nonsmooth_func is None else value + nonsmooth_func.evaluate(current_point))
+            step = self.__scheduler.get_step_value(it, func.get_directional(search_point))
+            func.on_step(it, abs(step))
+            previous_point = current_point
+            current_point = search_point + multiplier * step * gradient
+            if nonsmooth_func is not None:
+                # a segment search may step against the gradient, the shrinkage is still by the length of the step
+                current_point = nonsmooth_func.prox(current_point, abs(step))
             tracking.append(current_point)
+            self.__history.trim(tracking, values)
             it += 1
+            func.on_iteration(it, current_point)
+        values.append(None)
         func.stop_tracking()
         return Report(func, tracking, it == self.__limit,
-                      self.__scheduler.get_hyper_parameters(), self.__scheduler.get_name())
+                      self.__scheduler.get_hyper_parameters(), self.__scheduler.get_name(), _values=values,
+                      _iterations=it)
+
+
+class LockstepGradientOptimizer:
+    """
+    Optimizes several independent problems at once, updating all of them with one vectorized operation.
+    A problem stops taking steps as soon as the break checker is done with it.
+    """
+
+    def __init__(self, scheduler: Scheduler, break_checker: BreakChecker, limit: int, history: int | None = None):
+        """
+        history limits the number of last points of each problem kept in its report, as in GradientOptimizer.
+        """
+        self.__scheduler = scheduler
+        self.__break_checker = break_checker
+        self.__limit = limit
+        self.__history = History(history)
+
+    def optimize(self, func: LockstepBatchFunction, starting_points: numpy.ndarray) -> list[Report]:
+        func.start_tracking()
+        self.__scheduler.reset()
+
+        multiplier = -1
+
+        count = func.get_problem_count()
+        current_points = numpy.array(numpy.broadcast_to(starting_points, (count, starting_points.shape[-1])),
+                                     dtype=float)
+        tracking: list[numpy.ndarray] = [current_points]
+        problem_tracking: list[list[numpy.ndarray] | None] = [None] * count
+        iterations = numpy.zeros(count, dtype=int)
+        active = numpy.arange(count)
+        considered: list[numpy.ndarray] = [current_points]
+
+        it = 0
+        func.select(active)
+
+        while len(active) > 0 and it < self.__limit:
+            done = numpy.broadcast_to(self.__break_checker.is_done(considered, func), active.shape)
+            if done.any():
+                LockstepGradientOptimizer.__finish(problem_tracking, tracking, active[done])
+                active = active[~done]
+                considered = [points[~done] for points in considered]
+                func.select(active)
+                if len(active) == 0:
+                    break
+            gradient = func.value_and_gradient(considered[-1])[1]
+            steps = self.__scheduler.get_step_values(it, func.get_directional(considered[-1]))
+            new_points = considered[-1] + multiplier * steps[:, None] * gradient
+            current_points = current_points.copy()
+            current_points[active] = new_points
+            tracking.append(current_points)
+            self.__history.trim(tracking)
+            considered = [considered[-1], new_points]
+            it += 1
+            iterations[active] = it
+        LockstepGradientOptimizer.__finish(problem_tracking, tracking, active)
+        func.stop_tracking()
+
+        return [Report(problem, problem_tracking[k], iterations[k] == self.__limit,
+                       self.__scheduler.get_hyper_parameters(), self.__scheduler.get_name(),
+                       _iterations=int(iterations[k]))
+                for k, problem in enumerate(func.problems)]
+
+    @staticmethod
+    def __finish(problem_tracking: list[list[numpy.ndarray] | None], tracking: list[numpy.ndarray],
+                 problems: numpy.ndarray) -> None:
+        """
+        Saves the trajectories of the problems which stop now, the last kept points are all theirs.
+        """
+        for k in problems:
+            problem_tracking[k] = list(numpy.array([points[k] for points in tracking]))
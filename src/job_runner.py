@@ -0,0 +1,244 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Sequence
+
+import numpy
+
+from src import break_checker, functions, scheduler
+from src.functions import Dataset, GradientMode, HyperFunction, SimultaneousPerturbation, VectorFunction
+from src.functions import dataset_to_arrays, is_sparse
+from src.report import Report
+from src.sgd_optimizer import StochasticGradientOptimizer
+
+"""
+job_runner.py
+Runs StochasticGradientOptimizer jobs described declaratively and caches their reports on disk.
+A job is a JSON object, e.g.
+    {
+        "model": "linear", "dataset": "students", "start": [0, 0, 0], "batch_size": 32, "limit": 1000,
+        "scheduler": {"name": "ExponentialDecayScheduler", "step0": 0.01, "lamda": 0.001},
+        "break_checker": {"name": "ArgumentAbsoluteBreakChecker", "epsilon": 0.0001},
+        "regularizer": {"name": "L2", "lamda": 0.01},
+        "options": {"validation_fraction": 0.2, "gradient_mode": "svrg", "dtype": "float32"}
+    }
+Schedulers, break checkers and regularizers are named by their classes, options are passed to optimize.
+Models (hyper functions) and datasets cannot be written in JSON, they are registered in the JobRunner by name.
+A job is cached under the SHA-256 of its configuration with the dataset name replaced by a fingerprint of its data,
+so the same job on changed data runs again. A model is identified by its name only: rename it when its code changes.
+"""
+
+DEFAULT_JOB = {"seed": 0, "history": None, "accelerated": False, "regularizer": {"name": "L2", "lamda": 0},
+               "options": {}}
+
+_CACHE_FORMAT = 2
+
+_worker_runner: "JobRunner | None" = None
+
+
+def load_jobs(path: str) -> list[dict[str, Any]]:
+    """
+    Reads a list of jobs, or an object with "defaults" shared by its "jobs".
+    """
+    with open(path, "r") as jobs_file:
+        content = json.load(jobs_file)
+    if isinstance(content, list):
+        return content
+    return [{**content.get("defaults", {}), **job} for job in content["jobs"]]
+
+
+def get_fingerprint(dataset: Dataset) -> str:
+    """
+    SHA-256 of the features and the marks stored in float64 (the CSR arrays of sparse features).
+    """
+    digest = hashlib.sha256()
+    features, marks = dataset_to_arrays(dataset)
+    parts = (features.data, features.indices, features.indptr) if is_sparse(features) else (features,)
+    for array in (*parts, marks):
+        array = numpy.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+class _CachedJobFunction(VectorFunction):
+    """
+    The function of a finished job as seen by its report: the mean loss on the dataset plus the regularizer.
+    Call data is the one recorded when the job was run.
+    """
+
+    def __init__(self, model: HyperFunction, dataset: tuple[numpy.ndarray, numpy.ndarray],
+                 regular_func: functions.L, call_data: dict[str, int]):
+        super().__init__(lambda w: float(numpy.mean(model.apply_to_dataset(*dataset, w))) + regular_func.evaluate(w),
+                         regular_func.get_arg_count())
+        self.__call_data = call_data
+
+    def get_call_data(self) -> dict[str, int]:
+        return dict(self.__call_data)
+
+
+class JobRunner:
+    def __init__(self, cache_dir: str, workers: int = 4, executor: Executor | None = None):
+        """
+        Cache misses are run on a pool of worker processes, forked so that registered models need not be picklable.
+        Where fork is unavailable threads are used, their jobs share the global random generator and are not
+        reproducible. A given executor is used as is, it must be able to call methods of the runner.
+        """
+        assert workers > 0
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.__executor = executor
+        self.__models: dict[str, HyperFunction] = {}
+        self.__datasets: dict[str, tuple[numpy.ndarray, numpy.ndarray]] = {}
+        self.__fingerprints: dict[str, str] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def add_model(self, name: str, model: HyperFunction) -> None:
+        self.__models[name] = model
+
+    def add_dataset(self, name: str, dataset: Dataset) -> None:
+        self.__datasets[name] = dataset_to_arrays(dataset)
+        self.__fingerprints[name] = get_fingerprint(self.__datasets[name])
+
+    def get_key(self, job: dict[str, Any]) -> str:
+        job = {**DEFAULT_JOB, **job}
+        assert job["model"] in self.__models and job["dataset"] in self.__datasets
+        job["dataset"] = self.__fingerprints[job["dataset"]]
+        job["format"] = _CACHE_FORMAT
+        return hashlib.sha256(json.dumps(job, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+    def run(self, jobs: Sequence[dict[str, Any]]) -> list[tuple[Report, int]]:
+        """
+        Returns the report and the number of batch evaluations of each job, like StochasticGradientOptimizer.optimize.
+        Identical jobs run once, all the reports are restored from the records, whether cached or just computed.
+        """
+        keys = [self.get_key(job) for job in jobs]
+        records = {key: self.__load(key) for key in keys}
+        missing = {key: job for key, job in zip(keys, jobs) if records[key] is None}
+        self.cache_hits += len(keys) - len(missing)
+        self.cache_misses += len(missing)
+        if len(missing) > 0:
+            with self.__get_pool() as pool:
+                run_job = _run_job if self.__executor is None else self.execute
+                futures = {key: pool.submit(run_job, job) for key, job in missing.items()}
+                for key, future in futures.items():
+                    records[key] = future.result()
+                    self.__store(key, records[key])
+        return [self.__to_report({**DEFAULT_JOB, **job}, records[key]) for key, job in zip(keys, jobs)]
+
+    def execute(self, job: dict[str, Any]) -> dict[str, Any]:
+        """
+        Runs a job bypassing the cache, returns the record to be cached.
+        """
+        job = {**DEFAULT_JOB, **job}
+        random.seed(job["seed"])
+        numpy.random.seed(job["seed"])
+        optimizer = StochasticGradientOptimizer(JobRunner.__build(scheduler, scheduler.Scheduler, job["scheduler"]),
+                                                JobRunner.__build(break_checker, break_checker.BreakChecker,
+                                                                  job["break_checker"]),
+                                                self.__models[job["model"]], job["limit"], job["history"],
+                                                job["accelerated"])
+        report, times_used = optimizer.optimize(self.__datasets[job["dataset"]],
+                                                numpy.asarray(job["start"], dtype=float), job["batch_size"],
+                                                self.__build_regularizer(job), **JobRunner.__get_options(job))
+        return {
+            "tracking": [[float(x) for x in point] for point in report.get_raw_tracking()],
+            "values": None if report._values is None else [None if v is None else float(v) for v in report._values],
+            "aborted": bool(report._is_aborted),
+            "hyperparameters": {k: float(v) for k, v in report._hyperparameters.items()},
+            "strategy": report._strategy_name,
+            "mean_error_value": None if report._mean_error_value is None else float(report._mean_error_value),
+            "iterations": report.get_iterations(),
+            "call_data": {k: int(v) for k, v in report._func.get_call_data().items()},
+            "times_used": times_used
+        }
+
+    def __get_pool(self) -> Executor:
+        if self.__executor is not None:
+            return _Borrowed(self.__executor)
+        if "fork" not in multiprocessing.get_all_start_methods():
+            return ThreadPoolExecutor(self.workers, initializer=_set_worker_runner, initargs=(self,))
+        return ProcessPoolExecutor(self.workers, multiprocessing.get_context("fork"),
+                                   initializer=_set_worker_runner, initargs=(self,))
+
+    def __get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def __load(self, key: str) -> dict[str, Any] | None:
+        try:
+            with open(self.__get_path(key), "r") as record_file:
+                return json.load(record_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def __store(self, key: str, record: dict[str, Any]) -> None:
+        """
+        Writes a temporary file and renames it, so an interrupted run never leaves a broken record.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(descriptor, "w") as record_file:
+            json.dump(record, record_file)
+        os.replace(temporary_path, self.__get_path(key))
+
+    def __to_report(self, job: dict[str, Any], record: dict[str, Any]) -> tuple[Report, int]:
+        func = _CachedJobFunction(self.__models[job["model"]], self.__datasets[job["dataset"]],
+                                  self.__build_regularizer(job), record["call_data"])
+        report = Report(func, [numpy.array(point) for point in record["tracking"]], record["aborted"],
+                        record["hyperparameters"], record["strategy"], record["mean_error_value"],
+                        _values=record["values"], _iterations=record["iterations"])
+        return report, record["times_used"]
+
+    @staticmethod
+    def __build(module: Any, base: type, specification: dict[str, Any]) -> Any:
+        parameters = dict(specification)
+        cls = getattr(module, parameters.pop("name"))
+        assert isinstance(cls, type) and issubclass(cls, base)
+        return cls(**parameters)
+
+    @staticmethod
+    def __build_regularizer(job: dict[str, Any]) -> functions.L:
+        parameters = dict(job["regularizer"])
+        cls = getattr(functions, parameters.pop("name"))
+        assert isinstance(cls, type) and issubclass(cls, functions.L)
+        return cls(len(job["start"]), **parameters)
+
+    @staticmethod
+    def __get_options(job: dict[str, Any]) -> dict[str, Any]:
+        options = dict(job["options"])
+        if "gradient_mode" in options:
+            options["gradient_mode"] = GradientMode(options["gradient_mode"])
+        if "dtype" in options:
+            options["dtype"] = numpy.dtype(options["dtype"]).type
+        if "perturbation" in options:
+            options["perturbation"] = SimultaneousPerturbation(**options["perturbation"])
+        return options
+
+
+class _Borrowed:
+    """
+    Context manager that uses an executor without shutting it down.
+    """
+
+    def __init__(self, executor: Executor):
+        self.__executor = executor
+
+    def __enter__(self) -> Executor:
+        return self.__executor
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+def _set_worker_runner(runner: JobRunner) -> None:
+    global _worker_runner
+    _worker_runner = runner
+
+
+def _run_job(job: dict[str, Any]) -> dict[str, Any]:
+    return _worker_runner.execute(job)
@@ -0,0 +1,123 @@
+import math
+
+import numpy
+
+from src.break_checker import BreakChecker
+from src.functions import DerivableFunction
+from src.gradient_optimizer import History
+from src.report import Report
+
+"""
+newton_optimizer.py
+Truncated Newton method: the Newton step is found by conjugate gradients inside a trust region.
+Only Hessian-vector products are used (DerivableFunction.get_hessian_product), the Hessian is never formed.
+"""
+
+
+class NewtonCGOptimizer:
+    __SHRINK_BELOW = 0.25
+    __EXPAND_ABOVE = 0.75
+
+    def __init__(self, break_checker: BreakChecker, limit: int, trust_radius: float = 1,
+                 max_trust_radius: float = 10 ** 3, acceptance: float = 0.1, cg_limit: int | None = None,
+                 history: int | None = None):
+        """
+        A step is accepted when the actual decrease is at least acceptance of the one predicted by the quadratic model.
+        cg_limit bounds the number of conjugate gradient iterations per step, the dimension by default.
+        """
+        assert 0 < trust_radius <= max_trust_radius and 0 <= acceptance < NewtonCGOptimizer.__SHRINK_BELOW
+        self.__break_checker = break_checker
+        self.__limit = limit
+        self.trust_radius = trust_radius
+        self.max_trust_radius = max_trust_radius
+        self.acceptance = acceptance
+        self.__cg_limit = cg_limit
+        self.__history = History(history)
+
+    def get_hyper_parameters(self) -> dict[str, float]:
+        return {"trust_radius": self.trust_radius, "max_trust_radius": self.max_trust_radius,
+                "acceptance": self.acceptance}
+
+    def get_name(self) -> str:
+        return self.__class__.__name__
+
+    def optimize(self, func: DerivableFunction, starting_point: tuple[float, ...] | None = None) -> Report:
+        func.start_tracking()
+
+        if starting_point is None:
+            current_point: numpy.ndarray = numpy.zeros(func.get_arg_count())
+        else:
+            current_point: numpy.ndarray = numpy.array(starting_point, dtype=float)
+        tracking: list[numpy.ndarray] = [current_point]
+        values: list[float | None] = []
+        radius = self.trust_radius
+
+        it = 0
+        func.on_iteration(it, current_point)
+
+        while (not self.__break_checker.is_done(tracking, func)) and it < self.__limit:
+            value, gradient = func.value_and_gradient(current_point)
+            step, hessian_step = self.__get_newton_step(func, current_point, gradient, radius)
+            predicted = -(gradient @ step + hessian_step @ step / 2)
+            candidate = current_point + step
+            candidate_value = func.value_and_gradient(candidate)[0]
+            ratio = (value - candidate_value) / predicted if predicted > 0 else -1
+
+            if ratio < NewtonCGOptimizer.__SHRINK_BELOW:
+                radius /= 4
+            elif ratio > NewtonCGOptimizer.__EXPAND_ABOVE and numpy.linalg.norm(step) >= 0.99 * radius:
+                radius = min(2 * radius, self.max_trust_radius)
+
+            it += 1
+            if ratio > self.acceptance:
+                values.append(value)
+                current_point = candidate
+                tracking.append(current_point)
+                self.__history.trim(tracking, values)
+                func.on_iteration(it, current_point)
+        values.append(None)
+        func.stop_tracking()
+        return Report(func, tracking, it == self.__limit, self.get_hyper_parameters(), self.get_name(),
+                      _values=values, _iterations=it)
+
+    def __get_newton_step(self, func: DerivableFunction, point: numpy.ndarray, gradient: numpy.ndarray,
+                          radius: float) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Steihaug conjugate gradients for the Newton system, returns the step and the Hessian applied to it.
+        Stops on the trust region boundary or on a direction of negative curvature.
+        """
+        step = numpy.zeros_like(gradient)
+        hessian_step = numpy.zeros_like(gradient)
+        residual = gradient.copy()
+        direction = -residual
+        residual_square = float(residual @ residual)
+        tolerance = min(0.5, math.sqrt(math.sqrt(residual_square))) * math.sqrt(residual_square)
+        for _ in range(self.__cg_limit if self.__cg_limit is not None else len(gradient)):
+            if math.sqrt(residual_square) <= tolerance:
+                break
+            hessian_direction = func.get_hessian_product(point, direction)
+            curvature = float(direction @ hessian_direction)
+            if curvature <= 0:
+                tau = NewtonCGOptimizer.__get_boundary_coefficient(step, direction, radius)
+                return step + tau * direction, hessian_step + tau * hessian_direction
+            alpha = residual_square / curvature
+            if numpy.linalg.norm(step + alpha * direction) >= radius:
+                tau = NewtonCGOptimizer.__get_boundary_coefficient(step, direction, radius)
+                return step + tau * direction, hessian_step + tau * hessian_direction
+            step = step + alpha * direction
+            hessian_step = hessian_step + alpha * hessian_direction
+            residual = residual + alpha * hessian_direction
+            next_residual_square = float(residual @ residual)
+            direction = -residual + (next_residual_square / residual_square) * direction
+            residual_square = next_residual_square
+        return step, hessian_step
+
+    @staticmethod
+    def __get_boundary_coefficient(step: numpy.ndarray, direction: numpy.ndarray, radius: float) -> float:
+        """
+        Returns tau >= 0 such that step + tau * direction lies on the sphere of the given radius.
+        """
+        a = float(direction @ direction)
+        b = 2 * float(step @ direction)
+        c = float(step @ step) - radius ** 2
+        return (-b + math.sqrt(max(b ** 2 - 4 * a * c, 0))) / (2 * a)
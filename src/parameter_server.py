@@ -0,0 +1,183 @@
+import multiprocessing
+import os
+import random
+import time
+from multiprocessing.connection import Client, Connection, Listener, wait
+
+import numpy
+
+from src.break_checker import ArgumentAbsoluteBreakChecker, BreakChecker
+from src.functions import BatchAutomatedDerivableFunction, DerivableFunction, Dataset, HyperFunction, VectorFunction
+from src.functions import dataset_to_arrays
+from src.gradient_optimizer import History
+from src.report import Report
+from src.scheduler import BarzilaiBorweinScheduler, ExactLineSearchScheduler, Scheduler, SegmentScheduler
+
+"""
+parameter_server.py
+Asynchronous SGD with a parameter server: the server holds the weights, worker processes compute mini-batch
+gradients on their shards of the dataset and push them, each one gets the current weights back right away.
+A gradient computed at weights older than max_staleness updates is rejected, so the staleness is bounded.
+Workers are connected by pipes or by TCP (multiprocessing.connection), other nodes can join with run_worker.
+"""
+
+
+def run_worker(connection: Connection, hyper_func: HyperFunction, shard: Dataset, batch_size: int,
+               regular_func: DerivableFunction, seed: int = 0, dtype: type = numpy.float64) -> None:
+    """
+    Answers the weights sent by the server with the batch gradient at them until the server sends None.
+    On another node the connection is multiprocessing.connection.Client(address, authkey=authkey).
+    """
+    random.seed(seed)
+    numpy.random.seed(seed)
+    func = BatchAutomatedDerivableFunction(hyper_func, shard, batch_size, regular_func, dtype=dtype)
+    objects = range(len(func.get_objects_arrays()[1]))
+    with connection:
+        while (message := connection.recv()) is not None:
+            version, point = message
+            connection.send((version, func.get_batch_gradient_at(random.sample(objects, batch_size), point)))
+
+
+def _connect_worker(address: tuple[str, int], authkey: bytes, *args) -> None:
+    run_worker(Client(address, authkey=authkey), *args)
+
+
+class _ServerFunction(VectorFunction):
+    """
+    The function as seen by the server and its report: it has no data, only the received gradients are counted.
+    """
+    evaluable = False
+
+    def __init__(self, dimension: int):
+        super().__init__(_ServerFunction.__evaluate, dimension)
+        self.times_gradient_used = 0
+
+    @staticmethod
+    def __evaluate(point: numpy.ndarray) -> float:
+        raise NotImplementedError("The parameter server has no data to evaluate the function")
+
+    def get_call_data(self) -> dict[str, int]:
+        return {"to_gradient": self.times_gradient_used}
+
+
+class ParameterServerOptimizer:
+    def __init__(self, scheduler: Scheduler, break_checker: BreakChecker, hyper_func: HyperFunction, limit: int,
+                 workers: int = 4, max_staleness: int | None = None, history: int | None = None,
+                 address: tuple[str, int] | None = None, authkey: bytes | None = None, remote_workers: int = 0,
+                 seed: int = 0):
+        """
+        limit is the number of updates of the weights. max_staleness is the number of workers by default.
+        The server has no data, so schedulers which search along the gradient and break checkers which evaluate
+        the function can not be used.
+        With an address workers connect to the server by TCP, remote_workers more are awaited from other nodes,
+        they must know the authkey. Local workers are forked processes, so hyper_func need not be picklable;
+        where fork is unavailable they are spawned and hyper_func must be picklable.
+        """
+        assert not isinstance(scheduler, (SegmentScheduler, ExactLineSearchScheduler, BarzilaiBorweinScheduler))
+        assert isinstance(break_checker, ArgumentAbsoluteBreakChecker)
+        assert workers >= 0 and remote_workers >= 0 and workers + remote_workers > 0
+        assert address is not None or remote_workers == 0
+        assert max_staleness is None or max_staleness >= 0
+        self.__scheduler = scheduler
+        self.__break_checker = break_checker
+        self.hyper_func = hyper_func
+        self.__limit = limit
+        self.workers = workers
+        self.max_staleness = max_staleness if max_staleness is not None else workers + remote_workers
+        self.__history = History(history)
+        self.address = address
+        self.authkey = authkey if authkey is not None else os.urandom(16)
+        self.remote_workers = remote_workers
+        self.seed = seed
+
+    def get_hyper_parameters(self) -> dict[str, float]:
+        result = self.__scheduler.get_hyper_parameters()
+        result["workers"] = self.workers + self.remote_workers
+        result["max_staleness"] = self.max_staleness
+        return result
+
+    def optimize(self, dataset: Dataset | None, hyperparams_begin: tuple[float, ...] | numpy.ndarray,
+                 batch_size: int, regular_func: DerivableFunction, dtype: type = numpy.float64) -> tuple[Report, int]:
+        """
+        The dataset is split between the local workers, it is not needed when all the workers are remote.
+        Returns the report and the number of received gradients,
+        the report statistics hold the throughput and the staleness of the applied gradients.
+        The server can not evaluate the function, so the report has no figure, only its summary.
+        """
+        assert (dataset is None) == (self.workers == 0)
+        worker_args = []
+        if self.workers > 0:
+            features, marks = dataset_to_arrays(dataset, dtype)
+            shards = numpy.array_split(numpy.arange(len(marks)), self.workers)
+            assert all(len(shard) >= batch_size for shard in shards)
+            worker_args = [(self.hyper_func, (features[shard], marks[shard]), batch_size, regular_func,
+                            self.seed + i, dtype) for i, shard in enumerate(shards)]
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context()
+        point = numpy.array(hyperparams_begin, dtype=float)
+        if self.address is None:
+            pipes = [context.Pipe() for _ in worker_args]
+            processes = [context.Process(target=run_worker, args=(child, *args), daemon=True)
+                         for (_, child), args in zip(pipes, worker_args)]
+            for process in processes:
+                process.start()
+            connections = [parent for parent, _ in pipes]
+            for _, child in pipes:
+                child.close()
+        else:
+            with Listener(self.address, authkey=self.authkey) as listener:
+                processes = [context.Process(target=_connect_worker, args=(listener.address, self.authkey, *args),
+                                             daemon=True) for args in worker_args]
+                for process in processes:
+                    process.start()
+                connections = [listener.accept() for _ in range(self.workers + self.remote_workers)]
+        try:
+            return self.__serve(_ServerFunction(len(point)), connections, point)
+        finally:
+            for connection in connections:
+                connection.close()
+            for process in processes:
+                process.join()
+
+    def __serve(self, func: _ServerFunction, connections: list[Connection],
+                current_point: numpy.ndarray) -> tuple[Report, int]:
+        tracking: list[numpy.ndarray] = [current_point]
+        staleness: list[int] = []
+        received = 0
+        version = 0
+        begin = time.perf_counter()
+        for connection in connections:
+            connection.send((version, current_point))
+
+        while (not self.__break_checker.is_done(tracking, func)) and version < self.__limit:
+            for connection in wait(connections):
+                gradient_version, gradient = connection.recv()
+                received += 1
+                if version - gradient_version <= self.max_staleness and version < self.__limit:
+                    staleness.append(version - gradient_version)
+                    step = self.__scheduler.get_step_value(version, None)
+                    current_point = current_point - step * gradient
+                    tracking.append(current_point)
+                    self.__history.trim(tracking)
+                    version += 1
+                connection.send((version, current_point))
+        elapsed = time.perf_counter() - begin
+
+        # every worker is computing a gradient, it is received before the worker is stopped
+        for connection in connections:
+            connection.recv()
+            received += 1
+            connection.send(None)
+        func.times_gradient_used = received
+        statistics = {
+            "updates_per_second": version / elapsed,
+            "gradients_per_second": (received - len(connections)) / elapsed,
+            "rejected": received - len(connections) - len(staleness),
+            "mean_staleness": float(numpy.mean(staleness)) if len(staleness) > 0 else 0,
+            "max_staleness": max(staleness, default=0),
+            "seconds": elapsed
+        }
+        return Report(func, tracking, version == self.__limit, self.get_hyper_parameters(),
+                      self.__class__.__name__, _iterations=version, _statistics=statistics), received
@@ -1,50 +1,113 @@
+from __future__ import annotations
+
+import functools
+import os
 from dataclasses import dataclass, field
-from typing import Any, Sequence, Callable
+from typing import Any, Sequence, Callable, TYPE_CHECKING
 
-import plotly.graph_objects as go
+import numpy
 import json
 
-from plotly.subplots import make_subplots
+from src.functions import Function, dataset_to_arrays
+from src.utilities import largest_triangle_three_buckets
 
-from src.functions import Function
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
 
 """
 report.py
 Displays job done by GradientOptimizer. Builds a graph of functions.
+Figures can also be exported to HTML/JSON files together with a JSON summary, without opening a browser.
+plotly is imported only when a figure is built, so optimizers can be used without it.
 """
 
-DEFAULT_CONFIG_PATH = "../config/display_settings.json"
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config", "display_settings.json")
+
+
+@functools.cache
+def load_config(config_path: str) -> dict[str, Any]:
+    with open(config_path, "r") as config_file:
+        return json.load(config_file)
 
 
 @dataclass
 class Report:
     _func: Function
-    _tracking: list[tuple[float, ...]]
+    _tracking: list[tuple[float, ...] | numpy.ndarray]
     _is_aborted: bool
     _hyperparameters: dict[str, float]
     _strategy_name: str
     _mean_error_value: float = None
     _func_calls: float = None
     _config_path: str = DEFAULT_CONFIG_PATH
-    _config: dict = field(init=False)
+    _values: list[float | None] | None = None
+    _iterations: int | None = None
+    _statistics: dict[str, float] | None = None
+    # the function and predfunc are called once on whole arrays of arguments instead of on every point,
+    # only for elementwise ones: a reduction inside them would reduce over the arrays
+    _vectorized: bool = False
+    _config: dict = field(init=False, default=None)
 
-    def __post_init__(self) -> None:
-        with open(self._config_path, "r") as config_file:
-            self._config = json.load(config_file)
+    __MAX_SHOWN_COORDINATES = 8
 
     def display(self) -> None:
+        self._build_figure().show(renderer="browser")
+
+    def display_dataset_comparison(self, dataset: Sequence[tuple[tuple[float, ...], float]], predfunc: Callable) -> None:
+        assert dataset is not None
+        self._build_comparison_graph(dataset, predfunc).show(renderer="browser")
+
+    def export(self, path: str) -> None:
+        self._write_figure(self._build_figure(), path)
+
+    def export_dataset_comparison(self, path: str, dataset: Sequence[tuple[tuple[float, ...], float]],
+                                  predfunc: Callable) -> None:
+        assert dataset is not None
+        self._write_figure(self._build_comparison_graph(dataset, predfunc), path)
+
+    def get_summary(self) -> dict[str, Any]:
+        return {
+            "strategy": self._strategy_name,
+            "iterations": self.get_iterations(),
+            "aborted": bool(self._is_aborted),
+            "call_data": {k: int(v) for k, v in self._func.get_call_data().items()},
+            "func_calls": self._func_calls,
+            "begin_point": [float(x) for x in self._tracking[0]] if len(self._tracking) > 0 else None,
+            "argmin": [float(x) for x in self._tracking[-1]] if len(self._tracking) > 0 else None,
+            "hyperparameters": {k: float(v) for k, v in self._hyperparameters.items()},
+            "mean_error_value": float(self._mean_error_value) if self._mean_error_value is not None else None,
+            "statistics": {k: float(v) for k, v in self._statistics.items()} if self._statistics is not None else None
+        }
+
+    def export_summary(self, path: str) -> None:
+        with open(path, "w") as summary_file:
+            json.dump(self.get_summary(), summary_file, indent=2)
+
+    def _write_figure(self, fig: go.Figure, path: str) -> None:
+        match os.path.splitext(path)[1].lower():
+            case ".html":
+                fig.write_html(path, include_plotlyjs=self._get_settings("export")["include_plotlyjs"])
+            case ".json":
+                fig.write_json(path)
+            case extension:
+                raise ValueError("Unsupported figure export format: " + extension)
+
+    def _build_figure(self) -> go.Figure:
+        if not self._func.evaluable:
+            raise NotImplementedError("Report can not draw a function that can not be evaluated, "
+                                      "use get_summary or export_summary.")
         match self._func.get_arg_count():
             case 2:
-                self._build_3d_graph()
+                return self._build_3d_graph()
             case _:
                 raise NotImplementedError("Report supports only functions with 2 args.")
 
-    def display_dataset_comparison(self, dataset: Sequence[tuple[tuple[float, ...], float]], predfunc: Callable) -> None:
-        assert dataset is not None
-        self._build_comparison_graph(dataset, predfunc)
+    def _build_comparison_graph(self, dataset: Sequence[tuple[tuple[float, ...], float]],
+                                predfunc: Callable) -> go.Figure:
+        from plotly.subplots import make_subplots
 
-    def _build_comparison_graph(self, dataset: Sequence[tuple[tuple[float, ...], float]], predfunc: Callable) -> None:
-        w = self._tracking[-1]
+        features, marks = dataset_to_arrays(dataset)
+        errors = marks - Report._predict(predfunc, features, marks, self._tracking[-1], self._vectorized)
         settings = self._get_settings("error_comparison")
         graph_settings = settings["graph"]
         alignment_settings = settings["alignment"]
@@ -65,11 +128,11 @@ class Report:
                 row=2, col=1
             )
             .add_trace(
-                self._get_dataset_trace(dataset, graph_settings),
+                self._get_dataset_trace(marks, graph_settings),
                 row=2, col=1
             )
             .add_trace(
-                self._get_dataset_error_trace(dataset, tuple(w), predfunc, graph_settings),
+                self._get_dataset_error_trace(errors, graph_settings),
                 row=2, col=1
             )
             .add_trace(
@@ -79,13 +142,35 @@ class Report:
         )
         for ann in fig.layout.annotations:
             ann.update(xref='x domain', x=0, xanchor='left')
-        fig.show(renderer="browser")
+        return fig
 
-    def get_raw_tracking(self) -> list[tuple[float, ...]]:
+    def get_raw_tracking(self) -> list[tuple[float, ...] | numpy.ndarray]:
         return self._tracking
 
-    def _format_point(self, point: tuple[float, ...]):
-        return "(" + ", ".join(map(lambda flt: self._format_precision(flt), point)) + ")"
+    def get_iterations(self) -> int:
+        return self._iterations if self._iterations is not None else len(self._tracking) - 1
+
+    def _get_value_at(self, index: int) -> float:
+        if self._values is not None and self._values[index] is not None:
+            return self._values[index]
+        return self._func.evaluate(numpy.asarray(self._tracking[index], dtype=float))
+
+    @staticmethod
+    def _predict(predfunc: Callable, features: numpy.ndarray, marks: numpy.ndarray,
+                 w: tuple[float, ...], vectorized: bool) -> numpy.ndarray:
+        if vectorized:
+            return numpy.broadcast_to(predfunc(features.T, *w), marks.shape)
+        return numpy.fromiter((predfunc(obj, *w) for obj in features), dtype=float, count=len(marks))
+
+    @staticmethod
+    def _decimate_series(values: numpy.ndarray, max_points: int) -> tuple[numpy.ndarray, numpy.ndarray]:
+        indices = largest_triangle_three_buckets(numpy.column_stack((numpy.arange(len(values)), values)), max_points)
+        return indices, values[indices]
+
+    def _format_point(self, point: tuple[float, ...] | numpy.ndarray):
+        shown = point if len(point) <= Report.__MAX_SHOWN_COORDINATES else point[:Report.__MAX_SHOWN_COORDINATES]
+        return ("(" + ", ".join(map(lambda flt: self._format_precision(flt), shown))
+                + (", ..." if len(shown) < len(point) else "") + ")")
 
     @staticmethod
     def _format_precision(value: float) -> str:
@@ -96,11 +181,15 @@ class Report:
         return max(map(len, map(lambda pair: pair[column], lst)))
 
     def _get_settings(self, dict_name: str) -> dict[str, Any]:
+        if self._config is None:
+            self._config = load_config(self._config_path)
         if dict_name not in self._config:
             raise KeyError("No parent dict with name " + dict_name)
         return self._config.get(dict_name)
 
-    def _build_3d_graph(self) -> None:
+    def _build_3d_graph(self) -> go.Figure:
+        import plotly.graph_objects as go
+
         fig = (
             go.Figure()
             .add_trace(self._get_table(self._get_settings("table")))
@@ -108,22 +197,35 @@ class Report:
             .add_trace(self._get_trace(self._get_settings("trace")))
         )
         fig.update_layout(autosize=True)
-        fig.show(renderer="browser")
+        return fig
+
+    @staticmethod
+    def _get_grid_axis(settings: dict[str, Any], coordinates: Sequence[float]) -> numpy.ndarray:
+        low, high = settings["display_range_bounds"]
+        low, high = min(low, min(coordinates)), max(high, max(coordinates))
+        margin = (high - low) * settings["grid_margin"]
+        return numpy.linspace(low - margin, high + margin, settings["grid_resolution"])
+
+    def _apply_on_grid(self, x_grid: numpy.ndarray, y_grid: numpy.ndarray) -> numpy.ndarray:
+        if self._vectorized:
+            return numpy.broadcast_to(numpy.asarray(self._func.apply(x_grid, y_grid), dtype=float), x_grid.shape)
+        return numpy.vectorize(self._func.apply, otypes=[float])(x_grid, y_grid)
 
     def _get_graph(self, settings: dict[str, Any]) -> go.Surface:
-        var_range = range(*settings["display_range_bounds"])
-        var_list = list(var_range)
-        z_rangevalues = [[self._func.apply(x, y) for x in var_range] for y in var_range]
+        import plotly.graph_objects as go
+
+        x_axis, y_axis = (Report._get_grid_axis(settings, coordinates) for coordinates in zip(*self._tracking))
+        z_rangevalues = self._apply_on_grid(*numpy.meshgrid(x_axis, y_axis))
         return go.Surface(
-            x=var_list,
-            y=var_list,
+            x=x_axis,
+            y=y_axis,
             z=z_rangevalues,
             colorscale=settings["colorscale"],
             contours={
                 "z": {
                     "show": True,
-                    "start": min(map(min, z_rangevalues)),
-                    "end": max(map(max, z_rangevalues)),
+                    "start": float(numpy.nanmin(z_rangevalues)),
+                    "end": float(numpy.nanmax(z_rangevalues)),
                     "size": settings["level_line_indent"]
                 }
             },
@@ -131,8 +233,10 @@ class Report:
         )
 
     def _get_table(self, settings: dict[str, Any]) -> go.Table:
+        import plotly.graph_objects as go
+
         table_values = [
-            ["Iterations", f"{len(self._tracking) - 1}"],
+            ["Iterations", f"{self.get_iterations()}"],
             ["Function call data", f"{"times=" + str(self._func_calls)
             if self._func_calls is not None
             else ", ".join(f"{k}={v}" for k, v in self._func.get_call_data().items() if v != 0)}"],
@@ -144,10 +248,11 @@ class Report:
             # ["Aborted?", "YES" if self._is_aborted else "NO"],
             ["Hyperparameters", ", ".join(f"{k}={self._format_precision(v)}" for k, v in self._hyperparameters.items())],
             ["Absolute mean error value", self._format_precision(self._mean_error_value)]
-            if self._mean_error_value is not None else []
+            if self._mean_error_value is not None else [],
+            ["Statistics", ", ".join(f"{k}={self._format_precision(v)}" for k, v in self._statistics.items())]
+            if self._statistics is not None else []
         ]
-        if len(table_values[-1]) == 0:
-            table_values.pop()
+        table_values = [row for row in table_values if len(row) > 0]
 
         x_alignment = settings["x_alignment"]
         proportions = [self._get_max_column_proportion(table_values, i) for i in range(2)]
@@ -161,8 +266,11 @@ class Report:
             columnwidth=proportions)
 
     def _get_trace(self, settings: dict[str, Any]) -> go.Scatter3d:
-        x_values, y_values = zip(*self._tracking)
-        tracking_len = len(self._tracking)
+        import plotly.graph_objects as go
+
+        indices = largest_triangle_three_buckets(numpy.array(self._tracking, dtype=float), settings["max_points"])
+        x_values, y_values = zip(*(self._tracking[i] for i in indices))
+        tracking_len = len(indices)
         default_marker = settings["default_marker"]
         special_marker = settings["special_marker"]
         marker_settings = settings["marker_params"].copy()
@@ -176,29 +284,31 @@ class Report:
         return go.Scatter3d(
             x=x_values,
             y=y_values,
-            z=[self._func.apply(x, y) for x, y in self._tracking],
+            z=[self._get_value_at(i) for i in indices],
             mode=settings["scatter_mode"],
             marker=marker_settings,
             line=settings["line_params"]
         )
-    def _get_dataset_trace(self, dataset: Sequence[tuple[tuple[float, ...], float]],
-                           settings: dict[str, Any]) -> go.Scatter:
-        dataset_len = len(dataset)
+
+    def _get_dataset_trace(self, marks: numpy.ndarray, settings: dict[str, Any]) -> go.Scatter:
+        import plotly.graph_objects as go
+
+        indices, values = Report._decimate_series(marks, settings["max_points"])
         return go.Scatter(
-            x=list(range(dataset_len)),
-            y=[dataset[i][1] for i in range(dataset_len)],
+            x=indices,
+            y=values,
             mode=settings["scatter_mode"],
             line_color=settings["data_line_color"],
             name=settings["data_graph_name"]
         )
 
-    def _get_dataset_error_trace(self, dataset: Sequence[tuple[tuple[float, ...], float]],
-                                 w: tuple[float, ...],
-                                 predfunc: Callable,
-                                 settings: dict[str, Any]) -> go.Scatter:
+    def _get_dataset_error_trace(self, errors: numpy.ndarray, settings: dict[str, Any]) -> go.Scatter:
+        import plotly.graph_objects as go
+
+        indices, values = Report._decimate_series(errors, settings["max_points"])
         return go.Scatter(
-            x=list(range(len(dataset))),
-            y=[expected - predfunc(obj, *w) for obj, expected in dataset],
+            x=indices,
+            y=values,
             mode=settings["scatter_mode"],
             line_color=settings["error_line_color"],
             name=settings["error_graph_name"]
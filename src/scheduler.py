@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 
-from src.functions import DirectionalFunction
+import numpy
+
+from src.functions import DirectionalFunction, BatchedDirectionalFunction, QuadraticDirectionalFunction
 import math
 
 
@@ -12,6 +14,16 @@ class Scheduler(ABC):
                        func: DirectionalFunction) -> float:
         return 0
 
+    def get_step_values(self, iteration_number: int, func: BatchedDirectionalFunction) -> numpy.ndarray:
+        return numpy.array([self.get_step_value(iteration_number, func.get_problem(k))
+                            for k in range(func.get_problem_count())])
+
+    def reset(self) -> None:
+        """
+        Called by optimizers before a run, schedulers which remember previous steps forget them here.
+        """
+        pass
+
     def get_hyper_parameters(self) -> dict[str, float]:
         return {key: float(value) for key, value in self.__dict__.items() if
                 not key.startswith(Scheduler.__AUXILIARY_PREFIX)}
@@ -29,6 +41,9 @@ class ExponentialDecayScheduler(Scheduler):
     def get_step_value(self, iteration_number: int, func: DirectionalFunction) -> float:
         return self.step0 * math.exp(-self.lamda * iteration_number)
 
+    def get_step_values(self, iteration_number: int, func: BatchedDirectionalFunction) -> numpy.ndarray:
+        return numpy.full(func.get_problem_count(), self.get_step_value(iteration_number, func))
+
 
 class PolynomialDecayScheduler(Scheduler):
     def __init__(self, alpha: float = 1 / 2, beta: float = 1):
@@ -40,6 +55,88 @@ class PolynomialDecayScheduler(Scheduler):
         h0 = 1 / math.sqrt(iteration_number + 1)
         return h0 * ((self.beta * iteration_number + 1) ** -self.alpha)
 
+    def get_step_values(self, iteration_number: int, func: BatchedDirectionalFunction) -> numpy.ndarray:
+        return numpy.full(func.get_problem_count(), self.get_step_value(iteration_number, func))
+
+
+class ExactLineSearchScheduler(Scheduler):
+    """
+    Takes the step to the exact minimum along the direction, for quadratic functions such as LinearLeastSquaresFunction.
+    """
+
+    def get_step_value(self, iteration_number: int, func: QuadraticDirectionalFunction) -> float:
+        assert isinstance(func, QuadraticDirectionalFunction)
+        return func.get_minimizer()
+
+
+class StochasticApproximationScheduler(Scheduler):
+    """
+    Gain sequence gain / (k + 1 + stability) ** decay of stochastic approximation, e.g. for SPSA gradients.
+    """
+
+    def __init__(self, gain: float, stability: float = 0, decay: float = 0.602):
+        assert gain > 0 and stability >= 0 and decay > 0
+        self.gain = gain
+        self.stability = stability
+        self.decay = decay
+
+    def get_step_value(self, iteration_number: int, func: DirectionalFunction) -> float:
+        return self.gain / (iteration_number + 1 + self.stability) ** self.decay
+
+    def get_step_values(self, iteration_number: int, func: BatchedDirectionalFunction) -> numpy.ndarray:
+        return numpy.full(func.get_problem_count(), self.get_step_value(iteration_number, func))
+
+
+class BarzilaiBorweinScheduler(Scheduler):
+    """
+    Step sᵀs / sᵀy from the differences s, y of the last two points and gradients, taken from the directional
+    functions of consecutive iterations. Grippo's non-monotone condition asks the value not to exceed the maximum
+    of the last memory values by more than a sufficient decrease. It is checked one step late, on the value
+    at the next point the optimizer computes anyway, so the safeguard costs no evaluations: a step violating it
+    is not undone, the next step is at most half of it instead.
+    """
+
+    def __init__(self, step0: float = 1, memory: int = 10, decrease: float = 10 ** -4,
+                 min_step: float = 10 ** -10, max_step: float = 10 ** 10):
+        assert step0 > 0 and memory > 0 and 0 < decrease < 1 and 0 < min_step <= step0 <= max_step
+        self.step0 = step0
+        self.memory = memory
+        self.decrease = decrease
+        self.min_step = min_step
+        self.max_step = max_step
+        self.reset()
+
+    def reset(self) -> None:
+        self.aux_previous_point: numpy.ndarray | None = None
+        self.aux_previous_gradient: numpy.ndarray | None = None
+        self.aux_previous_step: float | None = None
+        self.aux_bound: float | None = None
+        self.aux_values: list[float] = []
+
+    def get_step_value(self, iteration_number: int, func: DirectionalFunction) -> float:
+        point, gradient = func.starting_point, func.direction
+        step = self.__get_barzilai_borwein_step(point, gradient)
+        value = func.apply(0)
+        if self.aux_bound is not None and value > self.aux_bound:
+            step = max(min(step, self.aux_previous_step / 2), self.min_step)
+        self.aux_values = (self.aux_values + [value])[-self.memory:]
+        self.aux_bound = max(self.aux_values) - self.decrease * step * float(gradient @ gradient)
+        self.aux_previous_point, self.aux_previous_gradient, self.aux_previous_step = point, gradient, step
+        return step
+
+    def __get_barzilai_borwein_step(self, point: numpy.ndarray, gradient: numpy.ndarray) -> float:
+        if self.aux_previous_point is None:
+            return self.step0
+        s = point - self.aux_previous_point
+        y = gradient - self.aux_previous_gradient
+        curvature = float(s @ y)
+        if curvature <= 0:
+            return self.step0
+        return min(max(float(s @ s) / curvature, self.min_step), self.max_step)
+
+    def get_step_values(self, iteration_number: int, func: BatchedDirectionalFunction) -> numpy.ndarray:
+        raise NotImplementedError("BarzilaiBorweinScheduler keeps the history of a single problem.")
+
 
 class SegmentScheduler(Scheduler, ABC):
     def __init__(self, indent: float, count_iterations: int) -> None:
@@ -50,10 +147,18 @@ class SegmentScheduler(Scheduler, ABC):
         arg1, arg2 = self.indent, -self.indent
         return self._min_per_segment(func, arg1, arg2)
 
+    def get_step_values(self, iteration_number: int, func: BatchedDirectionalFunction) -> numpy.ndarray:
+        count = func.get_problem_count()
+        return self._min_per_segments(func, numpy.full(count, float(self.indent)),
+                                      numpy.full(count, -float(self.indent)))
+
     @abstractmethod
     def _min_per_segment(self, func: DirectionalFunction, a: float, b: float) -> float:
         pass
 
+    def _min_per_segments(self, func: BatchedDirectionalFunction, a: numpy.ndarray, b: numpy.ndarray) -> numpy.ndarray:
+        return numpy.array([self._min_per_segment(func.get_problem(k), a[k], b[k]) for k in range(len(a))])
+
 
 class DichotomyScheduler(SegmentScheduler):
     @staticmethod
@@ -118,3 +223,20 @@ class GolderRatioScheduler(SegmentScheduler):
             val_c, val_d = val_d, func.apply(d)
 
         return c if val_c <= val_d else d
+
+    def _min_per_segments(self, func: BatchedDirectionalFunction, a: numpy.ndarray, b: numpy.ndarray) -> numpy.ndarray:
+        n = self.count_iterations
+        delta = b - a
+        c = a + GolderRatioScheduler.__LEFT_INDENT * delta
+        d = a + GolderRatioScheduler.__RIGHT_INDENT * delta
+        val_c = func.apply(c)
+        val_d = func.apply(d)
+        for i in range(n):
+            left = val_c <= val_d
+            a, b = numpy.where(left, a, c), numpy.where(left, d, b)
+            c, d = (numpy.where(left, a + GolderRatioScheduler.__LEFT_INDENT * (b - a), d),
+                    numpy.where(left, c, a + GolderRatioScheduler.__RIGHT_INDENT * (b - a)))
+            val_probe = func.apply(numpy.where(left, c, d))
+            val_c, val_d = numpy.where(left, val_probe, val_d), numpy.where(left, val_c, val_probe)
+
+        return numpy.where(val_c <= val_d, c, d)
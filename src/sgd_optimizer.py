@@ -1,19 +1,81 @@
+import random
 import typing
 
+import numpy
+
 from src.break_checker import BreakChecker
-from src.gradient_optimizer import GradientOptimizer
+from src.gradient_optimizer import GradientOptimizer, LockstepGradientOptimizer
 from src.report import Report
 from src.scheduler import Scheduler
-from src.functions import BatchAutomatedDerivableFunction, HyperFunction, DerivableFunction
+from src.functions import (BatchAutomatedDerivableFunction, HyperFunction, DerivableFunction, Dataset,
+                           LockstepBatchFunction, L, GradientMode, SimultaneousPerturbation,
+                           dataset_to_arrays)
 
 
 class StochasticGradientOptimizer:
-    def __init__(self, scheduler: Scheduler, break_checker: BreakChecker, hyper_func: HyperFunction, limit: int):
-        self.grad_optimizer = GradientOptimizer(scheduler, break_checker, limit)
+    def __init__(self, scheduler: Scheduler, break_checker: BreakChecker, hyper_func: HyperFunction, limit: int,
+                 history: int | None = None, accelerated: bool = False):
+        self.grad_optimizer = GradientOptimizer(scheduler, break_checker, limit, history, accelerated)
+        self.lockstep_optimizer = LockstepGradientOptimizer(scheduler, break_checker, limit, history)
         self.hyper_func = hyper_func
 
-    def optimize(self, dataset: typing.Sequence[tuple[tuple[float, ...], float]], hyperparams_begin: tuple[float, ...],
-                 batch_size: int, regular_func: DerivableFunction):
-        to_optimize = BatchAutomatedDerivableFunction(self.hyper_func, dataset, batch_size, regular_func)
-        r = self.grad_optimizer.optimize(to_optimize, hyperparams_begin)
+    @staticmethod
+    def split_dataset(dataset: Dataset, validation_fraction: float, dtype: type = numpy.float64) -> (
+            tuple)[tuple[numpy.ndarray, numpy.ndarray], tuple[numpy.ndarray, numpy.ndarray]]:
+        assert 0 <= validation_fraction < 1
+        features, marks = dataset_to_arrays(dataset, dtype)
+        is_validation = numpy.zeros(len(marks), dtype=bool)
+        is_validation[random.sample(range(len(marks)), round(len(marks) * validation_fraction))] = True
+        training, validation = numpy.flatnonzero(~is_validation), numpy.flatnonzero(is_validation)
+        return (features[training], marks[training]), (features[validation], marks[validation])
+
+    def optimize(self, dataset: Dataset, hyperparams_begin: tuple[float, ...] | numpy.ndarray,
+                 batch_size: int, regular_func: DerivableFunction, validation_fraction: float = 0,
+                 validation_interval: int = 1, proximal: bool = False,
+                 gradient_mode: GradientMode = GradientMode.SGD, snapshot_interval: int | None = None,
+                 perturbation: SimultaneousPerturbation | None = None, dtype: type = numpy.float64,
+                 lazy_regularization: bool = False) -> tuple[Report, int]:
+        """
+        With proximal the batch gradient includes only the smooth part of the regularizer (an L1, L2 or Elastic),
+        the rest is applied by soft-thresholding after each step, so unneeded weights become exactly zero.
+        gradient_mode selects the estimator of the batch gradient, SVRG and SAGA reduce its variance.
+        With perturbation the batch gradient is estimated by SPSA with a cost independent of the number of weights.
+        dtype is the storage precision of the dataset, numpy.float32 halves its memory, sums stay in float64.
+        The features of the dataset may be a scipy.sparse matrix; with lazy_regularization the regularizer,
+        an L2, only updates the weights of the features present in the batch, each of them first gets the decay
+        of the steps it missed. The last point of the report is brought up to date. It can not be proximal,
+        the prox is applied to all the weights after every step.
+        """
+        assert not proximal or isinstance(regular_func, L)
+        assert not (proximal and lazy_regularization)
+        training, validation = StochasticGradientOptimizer.split_dataset(dataset, validation_fraction, dtype)
+        to_optimize = BatchAutomatedDerivableFunction(self.hyper_func, training, batch_size,
+                                                      regular_func.get_smooth_part() if proximal else regular_func,
+                                                      validation_objects=validation,
+                                                      validation_interval=validation_interval,
+                                                      gradient_mode=gradient_mode,
+                                                      snapshot_interval=snapshot_interval,
+                                                      perturbation=perturbation,
+                                                      dtype=dtype,
+                                                      lazy_regularization=lazy_regularization)
+        r = self.grad_optimizer.optimize(to_optimize, hyperparams_begin,
+                                        regular_func.get_nonsmooth_part() if proximal else None)
+        to_optimize.catch_up(r.get_raw_tracking()[-1])
+        r._mean_error_value = to_optimize.get_validation_loss(r.get_raw_tracking()[-1])
         return r, to_optimize.times_used
+
+    def optimize_many(self, datasets: typing.Sequence[Dataset], hyperparams_begin: tuple[float, ...] | numpy.ndarray,
+                      batch_size: int, regular_func: DerivableFunction, dtype: type = numpy.float64) -> (
+            list)[tuple[Report, int]]:
+        """
+        Fits an independent model to each dataset, all of them in lockstep.
+        hyperparams_begin is either one starting point for all models or a matrix with a starting point in each row.
+        """
+        problems = [BatchAutomatedDerivableFunction(self.hyper_func, dataset, batch_size, regular_func, dtype=dtype)
+                    for dataset in datasets]
+        to_optimize = LockstepBatchFunction(problems)
+        reports = self.lockstep_optimizer.optimize(to_optimize, numpy.asarray(hyperparams_begin, dtype=float))
+        mean_errors = to_optimize.get_training_losses(numpy.stack([r.get_raw_tracking()[-1] for r in reports]))
+        for r, mean_error in zip(reports, mean_errors):
+            r._mean_error_value = float(mean_error)
+        return [(r, problem.times_used) for r, problem in zip(reports, problems)]
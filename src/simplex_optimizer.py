@@ -0,0 +1,185 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Sequence
+
+import numpy
+
+from src.break_checker import BreakChecker, GradientAbsoluteBreakChecker
+from src.functions import Function
+from src.gradient_optimizer import History
+from src.report import Report
+
+"""
+simplex_optimizer.py
+Derivative-free Nelder-Mead method for functions whose gradients are meaningless, e.g. NoiseFunction.
+Only values of a plain Function are used. The report tracks the best vertex, a point is added when it improves.
+Break checkers compare the worst vertex of the simplex with the best one, i.e. the size of the simplex
+and the spread of its values.
+"""
+
+
+class _KnownValuesFunction(Function):
+    """
+    The function as seen by break checkers: values at the vertices are already known.
+    """
+
+    def __init__(self, function: Function, points: numpy.ndarray, values: numpy.ndarray):
+        super().__init__(function.function)
+        self.__source = function
+        self.__points = points
+        self.__values = values
+
+    def evaluate(self, point: numpy.ndarray) -> float:
+        for known, value in zip(self.__points, self.__values):
+            if numpy.array_equal(known, point):
+                return float(value)
+        return self.__source.evaluate(point)
+
+
+class NelderMeadOptimizer:
+    __REFLECTION = 1
+    __EXPANSION = 2
+    __CONTRACTION = 0.5
+    __SHRINK = 0.5
+
+    def __init__(self, break_checker: BreakChecker, limit: int, initial_size: float = 1,
+                 history: int | None = None):
+        """
+        initial_size is the length of the edges of the starting simplex along the coordinate axes.
+        """
+        assert not isinstance(break_checker, GradientAbsoluteBreakChecker)
+        assert initial_size > 0
+        self.__break_checker = break_checker
+        self.__limit = limit
+        self.initial_size = initial_size
+        self.__history = History(history)
+        self.__evaluations = 0
+
+    def get_hyper_parameters(self) -> dict[str, float]:
+        return {"initial_size": self.initial_size}
+
+    def get_name(self) -> str:
+        return self.__class__.__name__
+
+    def optimize(self, func: Function, starting_point: tuple[float, ...] | None = None) -> Report:
+        func.start_tracking()
+        self.__evaluations = 0
+
+        if starting_point is None:
+            current_point: numpy.ndarray = numpy.zeros(func.get_arg_count())
+        else:
+            current_point: numpy.ndarray = numpy.array(starting_point, dtype=float)
+        simplex = numpy.vstack((current_point, current_point + self.initial_size * numpy.eye(len(current_point))))
+        simplex_values = numpy.array([self.__first_value(func, current_point)]
+                                     + self._evaluate_points(func, simplex[1:]))
+        tracking: list[numpy.ndarray] = [current_point]
+        values: list[float] = [float(simplex_values[0])]
+
+        it = 0
+        func.on_iteration(it, current_point)
+
+        while (not self.__is_done(func, simplex, simplex_values)) and it < self.__limit:
+            simplex, simplex_values = self.__step(func, simplex, simplex_values)
+            it += 1
+            best = int(numpy.argmin(simplex_values))
+            if simplex_values[best] < values[-1]:
+                current_point = simplex[best].copy()
+                tracking.append(current_point)
+                values.append(float(simplex_values[best]))
+                self.__history.trim(tracking, values)
+            func.on_iteration(it, current_point)
+        func.stop_tracking()
+        return Report(func, tracking, it == self.__limit, self.get_hyper_parameters(), self.get_name(),
+                      _func_calls=self.__evaluations, _values=values, _iterations=it)
+
+    def __is_done(self, func: Function, simplex: numpy.ndarray, simplex_values: numpy.ndarray) -> bool:
+        extremes = simplex[[numpy.argmax(simplex_values), numpy.argmin(simplex_values)]]
+        return self.__break_checker.is_done(list(extremes), _KnownValuesFunction(func, simplex, simplex_values))
+
+    def __first_value(self, func: Function, point: numpy.ndarray) -> float:
+        return self._evaluate_points(func, point[None, :])[0]
+
+    def _evaluate_points(self, func: Function, points: Sequence[numpy.ndarray]) -> list[float]:
+        self.__evaluations += len(points)
+        return self._map(func, points)
+
+    def _map(self, func: Function, points: Sequence[numpy.ndarray]) -> list[float]:
+        return [func.evaluate(point) for point in points]
+
+    def _get_trial_values(self, func: Function, trials: dict[str, numpy.ndarray]) -> dict[str, float]:
+        """
+        Returns the values of the trial points known before the step, the rest are evaluated when needed.
+        """
+        return {}
+
+    def __step(self, func: Function, simplex: numpy.ndarray,
+               simplex_values: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]:
+        order = numpy.argsort(simplex_values)
+        simplex, simplex_values = simplex[order], simplex_values[order]
+        worst, worst_value = simplex[-1], simplex_values[-1]
+        centroid = simplex[:-1].mean(axis=0)
+        reflection = centroid + NelderMeadOptimizer.__REFLECTION * (centroid - worst)
+        trials = {
+            "reflection": reflection,
+            "expansion": centroid + NelderMeadOptimizer.__EXPANSION * (reflection - centroid),
+            "outside": centroid + NelderMeadOptimizer.__CONTRACTION * (reflection - centroid),
+            "inside": centroid + NelderMeadOptimizer.__CONTRACTION * (worst - centroid)
+        }
+        known = self._get_trial_values(func, trials)
+
+        def value_of(name: str) -> float:
+            if name not in known:
+                known[name] = self._evaluate_points(func, [trials[name]])[0]
+            return known[name]
+
+        reflection_value = value_of("reflection")
+        if reflection_value < simplex_values[0]:
+            replacement = min(("expansion", "reflection"), key=value_of)
+        elif reflection_value < simplex_values[-2]:
+            replacement = "reflection"
+        elif reflection_value < worst_value:
+            replacement = "outside" if value_of("outside") <= reflection_value else None
+        else:
+            replacement = "inside" if value_of("inside") < worst_value else None
+
+        if replacement is None:
+            simplex = simplex[0] + NelderMeadOptimizer.__SHRINK * (simplex - simplex[0])
+            simplex_values = numpy.array([simplex_values[0]] + self._evaluate_points(func, simplex[1:]))
+        else:
+            simplex[-1], simplex_values[-1] = trials[replacement], known[replacement]
+        return simplex, simplex_values
+
+
+class ParallelNelderMeadOptimizer(NelderMeadOptimizer):
+    """
+    Evaluates the starting simplex, all four trial points of a step and the shrunk vertices at once on a worker pool.
+    The function is evaluated in threads by default; a ProcessPoolExecutor requires a picklable function
+    and does not update its call counters, the report counts the evaluations itself.
+    """
+
+    def __init__(self, break_checker: BreakChecker, limit: int, initial_size: float = 1,
+                 history: int | None = None, workers: int = 4, executor: Executor | None = None):
+        assert workers > 0
+        super().__init__(break_checker, limit, initial_size, history)
+        self.workers = workers
+        self.__executor = executor
+        self.__pool: Executor | None = None
+
+    def get_hyper_parameters(self) -> dict[str, float]:
+        result = super().get_hyper_parameters()
+        result["workers"] = self.workers
+        return result
+
+    def optimize(self, func: Function, starting_point: tuple[float, ...] | None = None) -> Report:
+        if self.__executor is not None:
+            self.__pool = self.__executor
+            return super().optimize(func, starting_point)
+        with ThreadPoolExecutor(self.workers) as self.__pool:
+            return super().optimize(func, starting_point)
+
+    def _map(self, func: Function, points: Sequence[numpy.ndarray]) -> list[float]:
+        if len(points) == 1:
+            return super()._map(func, points)
+        return list(self.__pool.map(func.evaluate, points))
+
+    def _get_trial_values(self, func: Function, trials: dict[str, numpy.ndarray]) -> dict[str, float]:
+        return dict(zip(trials, self._evaluate_points(func, list(trials.values()))))
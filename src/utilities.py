@@ -1,4 +1,4 @@
-import math
+import numpy
 
 
 def element_wise_addition(first: tuple[float, ...], second: tuple[float, ...], multiplier: float) -> (
@@ -15,5 +15,32 @@ def multiply(p: tuple[float, ...], scalar) -> tuple[float, ...]:
     return tuple(scalar * a for a in p)
 
 
-def norm(vec: tuple[float, ...]):
-    return math.sqrt(sum(map(lambda x: x ** 2, vec)))
+def norm(vec: tuple[float, ...] | numpy.ndarray) -> float | numpy.ndarray:
+    return numpy.linalg.norm(vec, axis=-1)
+
+
+def largest_triangle_three_buckets(points: numpy.ndarray, threshold: int) -> numpy.ndarray:
+    """
+    Returns indices of at most threshold points, which keep the shape of the polyline given by points (n x d).
+    The first and the last points are always kept.
+    """
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return numpy.arange(count)
+    selected = numpy.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, count - 1
+    bounds = numpy.linspace(1, count - 1, threshold - 1).astype(int)
+    previous = points[0]
+    for bucket in range(threshold - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        following = points[bounds[bucket + 1]:bounds[bucket + 2]] if bucket + 2 < len(bounds) else points[-1:]
+        u = points[start:end] - previous
+        v = following.mean(axis=0) - previous
+        areas = (u ** 2).sum(axis=1) * (v ** 2).sum() - (u @ v) ** 2
+        selected[bucket + 1] = start + int(numpy.argmax(areas))
+        previous = points[selected[bucket + 1]]
+    return selected
+
+
+def soft_threshold(vec: numpy.ndarray, threshold: float | numpy.ndarray) -> numpy.ndarray:
+    return numpy.sign(vec) * numpy.maximum(numpy.abs(vec) - threshold, 0)